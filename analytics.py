@@ -0,0 +1,95 @@
+import numpy as np
+
+# Bars per year used to annualize Sharpe and Sortino, by yfinance interval
+PERIODS_PER_YEAR = {
+    '1m': 252 * 390,
+    '5m': 252 * 78,
+    '15m': 252 * 26,
+    '1h': 252 * 7,
+    '1d': 252,
+    '1wk': 52,
+    '1mo': 12,
+}
+
+# Function to mark the account to market on every bar
+def equity_curve(close, trades, initial_balance):
+    """
+    close: price array the backtest ran on
+    trades: columnar trade log from simulate_trades (entry_bar, exit_bar,
+    direction, size, entry_price, profit_loss_amount)
+    Realized P/L is booked on the exit bar; open positions are valued at
+    each bar's close, or at the last close before it when the bar is
+    missing. Overlapping positions are summed.
+    Returns: equity array aligned with close
+    """
+    close = np.asarray(close, dtype=float).reshape(-1)
+    n = len(close)
+    # Carry the last defined close over missing bars; bars before the first
+    # one can't hold a position, so they mark at zero
+    last = np.maximum.accumulate(np.where(np.isnan(close), 0, np.arange(n)))
+    close = np.nan_to_num(close[last])
+    entry_bar = trades['entry_bar']
+    exit_bar = trades['exit_bar']
+    exposure = trades['direction'] * trades['size']
+
+    realized = np.cumsum(np.bincount(exit_bar, weights=trades['profit_loss_amount'], minlength=n))
+
+    # Signed size and signed cost of the positions open on [entry, exit)
+    open_size = np.cumsum(
+        np.bincount(entry_bar, weights=exposure, minlength=n + 1)
+        - np.bincount(exit_bar, weights=exposure, minlength=n + 1))[:n]
+    open_cost = np.cumsum(
+        np.bincount(entry_bar, weights=exposure * trades['entry_price'], minlength=n + 1)
+        - np.bincount(exit_bar, weights=exposure * trades['entry_price'], minlength=n + 1))[:n]
+
+    return initial_balance + realized + open_size * close - open_cost
+
+# Function to compute risk metrics from an equity curve and its trades
+def performance_metrics(equity, trades, periods_per_year=252, index=None):
+    """
+    All array operations, no per-trade loop
+    index: optional DatetimeIndex aligned with equity, to also report trade
+    durations as time
+    Returns: dict of metrics (percentages as 0-100)
+    """
+    equity = np.asarray(equity, dtype=float)
+    n = len(equity)
+    metrics = {
+        'Return': float((equity[-1] - equity[0]) / equity[0] * 100) if n else 0.0,
+        'Max Drawdown': 0.0,
+        'Sharpe': 0.0,
+        'Sortino': 0.0,
+        'Exposure': 0.0,
+        'Average Duration (bars)': 0.0,
+        'Median Duration (bars)': 0.0,
+    }
+    if n < 2:
+        return metrics
+
+    peaks = np.maximum.accumulate(equity)
+    metrics['Max Drawdown'] = float(np.max((peaks - equity) / peaks)) * 100
+
+    returns = np.diff(equity) / equity[:-1]
+    volatility = returns.std(ddof=1)
+    if volatility > 0:
+        metrics['Sharpe'] = float(returns.mean() / volatility * np.sqrt(periods_per_year))
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    if downside > 0:
+        metrics['Sortino'] = float(returns.mean() / downside * np.sqrt(periods_per_year))
+
+    entry_bar = trades['entry_bar']
+    exit_bar = trades['exit_bar']
+    if len(entry_bar):
+        # Bars with at least one open position
+        open_count = np.cumsum(
+            np.bincount(entry_bar, minlength=n + 1) - np.bincount(exit_bar, minlength=n + 1))[:n]
+        metrics['Exposure'] = np.count_nonzero(open_count) / n * 100
+
+        duration = exit_bar - entry_bar
+        metrics['Average Duration (bars)'] = float(duration.mean())
+        metrics['Median Duration (bars)'] = float(np.median(duration))
+        if index is not None:
+            durations = index[exit_bar] - index[entry_bar]
+            metrics['Average Duration'] = durations.mean()
+            metrics['Median Duration'] = durations.median()
+    return metrics
@@ -1,12 +1,16 @@
+import json
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
 # Import from other modules
 from data_handler import get_data
-from indicators import calculate_ema, detect_ema_signals, is_pivot, detect_structure, generate_signals
-from backtester import backtest_strategy
-from visualizer import create_chart
+import pipeline
+from analytics import PERIODS_PER_YEAR, equity_curve, performance_metrics
+from backtester import trades_to_frame
+from monte_carlo import monte_carlo
+from visualizer import create_chart, create_equity_chart, create_distribution_chart
+from profiling import Profiler, maybe_stage
 
 # Set page configuration
 st.set_page_config(page_title="Algorithmic Trade", layout="wide")
@@ -27,11 +31,16 @@ end_date = st.sidebar.date_input("End Date", datetime.now())
 
 # User input for timeframe
 timeframe_options = {
+    "1 Minute": "1m",
+    "5 Minutes": "5m",
+    "15 Minutes": "15m",
+    "1 Hour": "1h",
     "1 Day": "1d",
     "1 Week": "1wk",
     "1 Month": "1mo"
 }
-timeframe = st.sidebar.selectbox("Select Timeframe", list(timeframe_options.keys()))
+timeframe = st.sidebar.selectbox("Select Timeframe", list(timeframe_options.keys()), index=4)
+st.sidebar.caption("Intraday bars reach back 30 days for 1 minute, 60 days for 5 and 15 minutes and 730 days for 1 hour.")
 
 # User input for strategy parameters
 st.sidebar.header("Strategy Parameters")
@@ -47,41 +56,36 @@ initial_balance = st.sidebar.number_input("Initial Account Balance", min_value=1
 risk_percentage = st.sidebar.slider("Risk Percentage per Trade", 0.5, 10.0, 2.0)
 stop_loss_percentage = st.sidebar.slider("Stop Loss Percentage", 0.5, 5.0, 2.5)
 take_profit_percentage = st.sidebar.slider("Take Profit Percentage", 1.0, 10.0, 5.0)
+intrabar = st.sidebar.checkbox("Check Stop/Target Against High/Low", value=False,
+                               help="Exit on the first bar whose range reaches a level instead of waiting for a close beyond it")
+both_touched_options = {"Stop Loss (conservative)": "stop", "Take Profit": "target"}
+both_touched = st.sidebar.selectbox("If a Bar Touches Both", list(both_touched_options.keys()), disabled=not intrabar)
+
+# Monte Carlo options
+st.sidebar.header("Monte Carlo")
+mc_paths = st.sidebar.select_slider("Simulated Paths", [1000, 10000, 50000, 100000], value=10000)
+mc_method = st.sidebar.radio("Resampling", ["Bootstrap", "Shuffle"], horizontal=True)
+ruin_level = st.sidebar.slider("Ruin Level (loss %)", 10.0, 90.0, 50.0)
+
+# Profiling options
+st.sidebar.header("Diagnostics")
+detailed_profile = st.sidebar.checkbox("Detailed profiling (allocations and cProfile, slower)", value=False)
 
 # Main function to process data and generate signals
-def process_data():
-    # Download data
+def process_data(profiler=None):
+    # Download data (served from the local store when already fetched)
     interval = timeframe_options[timeframe]
-    df = get_data(ticker, start_date, end_date, interval)
+    with maybe_stage(profiler, 'download') as record:
+        df = get_data(ticker, start_date, end_date, interval, on_error=st.error)
+        if record is not None and df is not None:
+            record['rows'] = len(df)
     
     if df is None:
         return None
     
-    # Make a copy of dataframe
-    df = df.copy()
-    
-    # Reset index to make it accessible with .iloc
-    df = df.reset_index()
-    
-    # Calculate EMA
-    df['EMA'] = calculate_ema(df, ema_period)
-    
-    # Detect EMA signals
-    df['EMASignal'] = detect_ema_signals(df, 'EMA', backcandles)
-    
-    # Apply pivot detection
-    df['isPivot'] = [is_pivot(df, i, window) for i in range(len(df))]
-    
-    # Apply structure detection
-    df['pattern_detected'] = [detect_structure(df, i, pattern_backcandles, pattern_window) for i in range(len(df))]
-    
-    # Generate trading signals
-    df['signal'] = generate_signals(df)
-    
-    # Set index back to Date for plotting
-    df.set_index('Date', inplace=True)
-    
-    return df
+    # Stages are cached, so only those affected by a changed slider rerun
+    return pipeline.process_data(df, ema_period, backcandles, window, pattern_backcandles, pattern_window,
+                                 profiler=profiler)
 
 # Main App Logic
 st.write("## Data Analysis and Backtesting")
@@ -89,8 +93,11 @@ st.write("## Data Analysis and Backtesting")
 # Add a button to process data and run backtest
 if st.button("Load Data and Run Backtest"):
     with st.spinner("Processing data..."):
+        # Per-stage timings for this run
+        profiler = Profiler(detailed=detailed_profile, cprofile=detailed_profile)
+        
         # Process data
-        df = process_data()
+        df = process_data(profiler)
         
         if df is not None:
             # Display data info
@@ -98,18 +105,31 @@ if st.button("Load Data and Run Backtest"):
             
             # Create visualization
             st.write("### Price Chart with Technical Indicators")
-            fig = create_chart(df, ticker, ema_period, plot_range=200)
+            # Whole history; long ranges are downsampled for the browser
+            with profiler.stage('chart', len(df)):
+                fig = create_chart(df, ticker, ema_period, plot_range=None)
             st.plotly_chart(fig, use_container_width=True)
             
             # Run backtest
             with st.spinner("Running backtest..."):
-                trades_df, final_balance = backtest_strategy(
+                trades_log, final_balance = pipeline.backtest_log(
                     df, 
+                    window, 
+                    pattern_backcandles, 
+                    pattern_window, 
                     initial_balance, 
                     risk_percentage, 
                     stop_loss_percentage, 
-                    take_profit_percentage
+                    take_profit_percentage,
+                    profiler=profiler,
+                    intrabar=intrabar,
+                    both_touched=both_touched_options[both_touched]
                 )
+                trades_df = trades_to_frame(trades_log, df.index)
+                with profiler.stage('metrics', len(df)):
+                    equity = equity_curve(df['Close'], trades_log, initial_balance)
+                    risk_metrics = performance_metrics(
+                        equity, trades_log, PERIODS_PER_YEAR[timeframe_options[timeframe]], df.index)
             
             # Display backtest results
             st.write("### Backtest Results")
@@ -140,6 +160,13 @@ if st.button("Load Data and Run Backtest"):
                 
                 st.write("No trades executed during this period.")
             
+            # Risk metrics from the bar-by-bar equity curve
+            col5, col6, col7, col8 = st.columns(4)
+            col5.metric("Max Drawdown", f"{risk_metrics['Max Drawdown']:.2f}%")
+            col6.metric("Sharpe Ratio", f"{risk_metrics['Sharpe']:.2f}")
+            col7.metric("Sortino Ratio", f"{risk_metrics['Sortino']:.2f}")
+            col8.metric("Exposure", f"{risk_metrics['Exposure']:.2f}%")
+            
             # Trade details
             if total_trades > 0:
                 st.write("#### Trade Details")
@@ -165,29 +192,43 @@ if st.button("Load Data and Run Backtest"):
                     key='download-csv'
                 )
                 
-                # Equity curve
+                # Equity curve, marked to market on every bar
                 st.write("#### Equity Curve")
-                equity_curve = trades_df[['Exit Date', 'Balance']].copy()
-                equity_curve = equity_curve.rename(columns={'Exit Date': 'Date'})
-                equity_curve.set_index('Date', inplace=True)
                 
-                import plotly.graph_objects as go
-                fig_equity = go.Figure()
-                fig_equity.add_trace(go.Scatter(
-                    x=equity_curve.index,
-                    y=equity_curve['Balance'],
-                    mode='lines+markers',
-                    name='Account Balance'
-                ))
+                with profiler.stage('equity_chart', len(df)):
+                    fig_equity = create_equity_chart(df.index, equity)
+                st.plotly_chart(fig_equity, use_container_width=True)
                 
-                fig_equity.update_layout(
-                    title="Account Balance Over Time",
-                    xaxis_title="Date",
-                    yaxis_title="Balance ($)",
-                    height=400
-                )
+                # How much of the result depends on the order and luck of the trades
+                st.write("#### Monte Carlo Robustness")
+                with profiler.stage('monte_carlo', mc_paths * total_trades):
+                    mc_summary, mc_result = monte_carlo(
+                        trades_log, initial_balance, mc_paths, mc_method.lower(), ruin_level=ruin_level)
                 
-                st.plotly_chart(fig_equity, use_container_width=True)
+                mc1, mc2, mc3, mc4 = st.columns(4)
+                mc1.metric("Median Final Balance", f"${mc_summary['Final Balance P50']:.2f}")
+                mc2.metric("5th Percentile Balance", f"${mc_summary['Final Balance P5']:.2f}")
+                mc3.metric("95th Percentile Drawdown", f"{mc_summary['Max Drawdown P95']:.2f}%")
+                mc4.metric("Risk of Ruin", f"{mc_summary['Risk of Ruin']:.2f}%")
+                
+                mc_col1, mc_col2 = st.columns(2)
+                mc_col1.plotly_chart(create_distribution_chart(
+                    mc_result['final_balance'], "Final Balance", "Balance ($)"), use_container_width=True)
+                mc_col2.plotly_chart(create_distribution_chart(
+                    mc_result['max_drawdown'], "Max Drawdown", "Drawdown (%)"), use_container_width=True)
+            
+            # Where the time went
+            with st.expander("Performance Profile"):
+                st.dataframe(profiler.to_frame(), use_container_width=True)
+                st.download_button(
+                    "Download Profile (JSON)",
+                    json.dumps(profiler.report(), indent=2, default=str),
+                    "profile.json",
+                    "application/json",
+                    key='download-profile'
+                )
+                if detailed_profile:
+                    st.code(profiler.stats_text())
         else:
             st.error("Failed to load data. Please check your input parameters and try again.")
 
@@ -1,124 +1,200 @@
+import numpy as np
 import pandas as pd
 
-# Function to backtest the strategy
-def backtest_strategy(df, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage):
-    # Create a copy of the dataframe to avoid modifying the original
-    backtest_df = df.copy()
+# Columns of the trade log, in display order
+TRADE_COLUMNS = [
+    'Entry Date', 'Exit Date', 'Position', 'Entry Price', 'Exit Price',
+    'Profit/Loss Percentage', 'Profit/Loss Amount', 'Balance'
+]
+
+# Rules for a bar whose range touches both the stop and the target
+BOTH_TOUCHED_RULES = ('stop', 'target')
+
+# Function to find the first bar at or after start whose range reaches lower or upper
+def first_touch(low, high, start, lower, upper):
+    """
+    Scan forward in growing chunks so the search costs O(trade length) in
+    NumPy instead of one Python step per bar
+    Returns: bar position of the touch, or -1 if neither level is reached
+    """
+    step = 64
+    while start < len(low):
+        stop = min(start + step, len(low))
+        hits = np.flatnonzero((low[start:stop] <= lower) | (high[start:stop] >= upper))
+        if len(hits):
+            return start + hits[0]
+        start = stop
+        step *= 2
+    return -1
+
+# Function to find the first bar at or after start where price leaves (lower, upper)
+def first_exit(prices, start, lower, upper):
+    """
+    Returns: bar position of the exit, or -1 if the level is never reached
+    """
+    return first_touch(prices, prices, start, lower, upper)
+
+# Function to price an exit on the bar that touched the stop or the target
+def intrabar_exit_price(open_price, low, high, position, stop_loss, take_profit, both_touched='stop'):
+    """
+    A bar that opens beyond a level fills at its open; otherwise the level
+    that was touched fills at its own price. When the range covers both
+    levels the order inside the bar is unknown, and both_touched decides
+    which one counts ('stop' is the conservative choice).
+    Returns: exit price
+    """
+    if position == 1:
+        gapped = open_price <= stop_loss or open_price >= take_profit
+        stop_hit, target_hit = low <= stop_loss, high >= take_profit
+    else:
+        gapped = open_price >= stop_loss or open_price <= take_profit
+        stop_hit, target_hit = high >= stop_loss, low <= take_profit
+    if gapped:
+        return open_price
+    if stop_hit and target_hit:
+        return stop_loss if both_touched == 'stop' else take_profit
+    return stop_loss if stop_hit else take_profit
+
+# Function to simulate the strategy over plain arrays
+def simulate_trades(close, signal, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage,
+                    open_prices=None, high=None, low=None, both_touched='stop'):
+    """
+    Array core of backtest_strategy: jumps from entry signal to exit bar
+    instead of walking every bar
+    Exits are checked against each bar's close, or, when open_prices, high
+    and low are given, against its full range with fills priced by
+    intrabar_exit_price
+    Returns: (trade log as a dict of equal-length arrays, final balance)
+    The log holds bar positions ('entry_bar', 'exit_bar'), 'direction'
+    (1 long, -1 short), 'size' and the prices, P/L and running balance
+    """
+    close = np.asarray(close, dtype=float).reshape(-1)
+    signal = np.asarray(signal).reshape(-1)
+    if both_touched not in BOTH_TOUCHED_RULES:
+        raise ValueError(f"both_touched must be one of {BOTH_TOUCHED_RULES}")
+    intrabar = high is not None
+    if intrabar:
+        open_prices = np.asarray(open_prices, dtype=float).reshape(-1)
+        high = np.asarray(high, dtype=float).reshape(-1)
+        low = np.asarray(low, dtype=float).reshape(-1)
+    else:
+        high = low = close
     
-    # Initialize trade tracking variables
-    balance = initial_balance
-    position = 0  # 0: no position, 1: long, -1: short
-    entry_price = 0
-    entry_date = None
-    stop_loss = 0
-    take_profit = 0
-    trades = []
-    position_size = 0
+    # Bars where a flat account would open a position (the first bar is skipped)
+    entries = np.flatnonzero((signal == 1) | (signal == -1))
+    entries = entries[entries >= 1]
+    
+    # Every trade consumes an entry signal, so this bounds the trade count
+    capacity = len(entries)
+    entry_bar = np.empty(capacity, dtype=np.int64)
+    exit_bar = np.empty(capacity, dtype=np.int64)
+    direction = np.empty(capacity, dtype=np.int8)
+    size = np.empty(capacity)
+    entry_prices = np.empty(capacity)
+    exit_prices = np.empty(capacity)
+    profit_loss = np.empty(capacity)
+    profit_loss_amount = np.empty(capacity)
+    balances = np.empty(capacity)
     
-    # Loop through the data
-    for i in range(1, len(backtest_df)):
-        current_date = backtest_df.index[i]
-        current_price = backtest_df['Close'].values[i]
-        signal = backtest_df['signal'].values[i]
+    balance = initial_balance
+    count = 0
+    k = 0
+    while k < capacity:
+        i = entries[k]
+        position = 1 if signal[i] == 1 else -1
+        entry_price = close[i]
         
-        # Check for existing position
-        if position != 0:
-            # For long positions
-            if position == 1:
-                # Check if stop loss or take profit hit
-                if current_price <= stop_loss or current_price >= take_profit:
-                    # Close the position
-                    exit_price = current_price
-                    profit_loss = (exit_price - entry_price) / entry_price * 100
-                    profit_loss_amount = (exit_price - entry_price) * position_size
-                    balance += profit_loss_amount
-                    
-                    # Record the trade
-                    trades.append({
-                        'Entry Date': entry_date,
-                        'Exit Date': current_date,
-                        'Position': 'BUY',
-                        'Entry Price': entry_price,
-                        'Exit Price': exit_price,
-                        'Profit/Loss Percentage': profit_loss,
-                        'Profit/Loss Amount': profit_loss_amount,
-                        'Balance': balance
-                    })
-                    
-                    # Reset position
-                    position = 0
-            
-            # For short positions
-            elif position == -1:
-                # Check if stop loss or take profit hit
-                if current_price >= stop_loss or current_price <= take_profit:
-                    # Close the position
-                    exit_price = current_price
-                    profit_loss = (entry_price - exit_price) / entry_price * 100
-                    profit_loss_amount = (entry_price - exit_price) * position_size
-                    balance += profit_loss_amount
-                    
-                    # Record the trade
-                    trades.append({
-                        'Entry Date': entry_date,
-                        'Exit Date': current_date,
-                        'Position': 'SELL',
-                        'Entry Price': entry_price,
-                        'Exit Price': exit_price,
-                        'Profit/Loss Percentage': profit_loss,
-                        'Profit/Loss Amount': profit_loss_amount,
-                        'Balance': balance
-                    })
-                    
-                    # Reset position
-                    position = 0
+        # Calculate position size based on risk percentage
+        risk_amount = balance * (risk_percentage / 100)
+        position_size = risk_amount / (entry_price * (stop_loss_percentage / 100))
+        if position == 1:
+            stop_loss = entry_price * (1 - stop_loss_percentage / 100)
+            take_profit = entry_price * (1 + take_profit_percentage / 100)
+            j = first_touch(low, high, i + 1, stop_loss, take_profit)
+        else:
+            stop_loss = entry_price * (1 + stop_loss_percentage / 100)
+            take_profit = entry_price * (1 - take_profit_percentage / 100)
+            j = first_touch(low, high, i + 1, take_profit, stop_loss)
         
-        # Check for new signals only if not in a position
-        if position == 0 and signal != 0:
-            # Calculate position size based on risk percentage
-            risk_amount = balance * (risk_percentage / 100)
-            
-            # Buy signal
-            if signal == 1:
-                position = 1
-                entry_price = current_price
-                entry_date = current_date
-                stop_loss = entry_price * (1 - stop_loss_percentage / 100)
-                take_profit = entry_price * (1 + take_profit_percentage / 100)
-                position_size = risk_amount / (entry_price * (stop_loss_percentage / 100))
-            
-            # Sell signal
-            elif signal == -1:
-                position = -1
-                entry_price = current_price
-                entry_date = current_date
-                stop_loss = entry_price * (1 + stop_loss_percentage / 100)
-                take_profit = entry_price * (1 - take_profit_percentage / 100)
-                position_size = risk_amount / (entry_price * (stop_loss_percentage / 100))
-    
-    # Close any open position at the end
-    if position != 0:
-        exit_price = backtest_df['Close'].values[-1]
+        # Positions still open at the end are closed on the last bar
+        still_open = j < 0
+        if still_open:
+            j = len(close) - 1
         
+        if intrabar and not still_open:
+            exit_price = intrabar_exit_price(
+                open_prices[j], low[j], high[j], position, stop_loss, take_profit, both_touched)
+        else:
+            exit_price = close[j]
         if position == 1:
-            profit_loss = (exit_price - entry_price) / entry_price * 100
-            profit_loss_amount = (exit_price - entry_price) * position_size
-        else:  # position == -1
-            profit_loss = (entry_price - exit_price) / entry_price * 100
-            profit_loss_amount = (entry_price - exit_price) * position_size
-            
-        balance += profit_loss_amount
+            pnl = (exit_price - entry_price) / entry_price * 100
+            pnl_amount = (exit_price - entry_price) * position_size
+        else:
+            pnl = (entry_price - exit_price) / entry_price * 100
+            pnl_amount = (entry_price - exit_price) * position_size
+        balance += pnl_amount
+        
+        entry_bar[count] = i
+        exit_bar[count] = j
+        direction[count] = position
+        size[count] = position_size
+        entry_prices[count] = entry_price
+        exit_prices[count] = exit_price
+        profit_loss[count] = pnl
+        profit_loss_amount[count] = pnl_amount
+        balances[count] = balance
+        count += 1
         
-        # Record the trade
-        trades.append({
-            'Entry Date': entry_date,
-            'Exit Date': backtest_df.index[-1],
-            'Position': 'BUY' if position == 1 else 'SELL',
-            'Entry Price': entry_price,
-            'Exit Price': exit_price,
-            'Profit/Loss Percentage': profit_loss,
-            'Profit/Loss Amount': profit_loss_amount,
-            'Balance': balance
-        })
+        if still_open:
+            break
+        
+        # A new position can be opened on the same bar the last one closed
+        k = np.searchsorted(entries, j)
     
-    return pd.DataFrame(trades), balance
+    trades = {
+        'entry_bar': entry_bar[:count],
+        'exit_bar': exit_bar[:count],
+        'direction': direction[:count],
+        'size': size[:count],
+        'entry_price': entry_prices[:count],
+        'exit_price': exit_prices[:count],
+        'profit_loss': profit_loss[:count],
+        'profit_loss_amount': profit_loss_amount[:count],
+        'balance': balances[:count],
+    }
+    return trades, balance
+
+# Function to turn a columnar trade log into the trade DataFrame
+def trades_to_frame(trades, index):
+    return pd.DataFrame({
+        'Entry Date': index[trades['entry_bar']],
+        'Exit Date': index[trades['exit_bar']],
+        'Position': np.where(trades['direction'] == 1, 'BUY', 'SELL'),
+        'Entry Price': trades['entry_price'],
+        'Exit Price': trades['exit_price'],
+        'Profit/Loss Percentage': trades['profit_loss'],
+        'Profit/Loss Amount': trades['profit_loss_amount'],
+        'Balance': trades['balance'],
+    }, columns=TRADE_COLUMNS)
+
+# Function to backtest the strategy
+def backtest_strategy(df, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage,
+                      intrabar=False, both_touched='stop'):
+    """
+    intrabar: check the stop and target against each bar's High and Low
+    instead of its Close, see simulate_trades
+    """
+    ranges = {}
+    if intrabar:
+        ranges = {'open_prices': df['Open'].to_numpy(), 'high': df['High'].to_numpy(), 'low': df['Low'].to_numpy()}
+    trades, balance = simulate_trades(
+        df['Close'].to_numpy(),
+        df['signal'].to_numpy(),
+        initial_balance,
+        risk_percentage,
+        stop_loss_percentage,
+        take_profit_percentage,
+        both_touched=both_touched,
+        **ranges
+    )
+    return trades_to_frame(trades, df.index), balance
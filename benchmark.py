@@ -0,0 +1,145 @@
+"""
+Benchmark the indicator and backtest stages on synthetic data
+
+    python benchmark.py --sizes 1e3 1e4 1e5 1e6 1e7 --output benchmark_results.json
+
+Runs headless: no Streamlit, no network. Each stage is timed on its own
+(best of --repeat runs) and then run once more under tracemalloc for its
+peak allocation. Per-candle functions (is_pivot, detect_structure) are
+timed over a fixed sample of candles and reported per call.
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import pipeline
+from backtester import backtest_strategy
+
+# Strategy parameters used for every run (the sidebar defaults in app.py)
+PARAMS = {
+    'ema_period': 150,
+    'backcandles': 15,
+    'window': 10,
+    'pattern_backcandles': 60,
+    'pattern_window': 11,
+}
+BACKTEST_PARAMS = (10000.0, 2.0, 2.5, 5.0)
+
+# Function to generate a seeded random-walk OHLCV series
+def synthetic_ohlcv(n, seed=0, start='2000-01-03', freq='min', start_price=1.1, volatility=0.0008):
+    """
+    Geometric random walk for the close; each bar opens at the previous close
+    and its high/low extend past the body by a random wick
+    Minute bars keep the index within pandas' datetime range up to 1e7 bars
+    (hourly bars from 2000 would run past 2262)
+    """
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.empty(n)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.normal(0, volatility / 2, (2, n))) * close
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + wick[0],
+        'Low': np.minimum(open_, close) - wick[1],
+        'Close': close,
+        'Volume': rng.integers(100, 10000, n),
+    }, index=pd.date_range(start, periods=n, freq=freq, name='Date'))
+
+# Function to time a callable (best of repeat) and measure its peak allocation
+def measure(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+# Function to build the stage callables for one series
+def stages(df, sample):
+    p = PARAMS
+    ema_df = df.assign(EMA=indicators.calculate_ema(df, p['ema_period']))
+    full = pipeline.process_data(df, cache=pipeline.StageCache(), **p)
+    candles = np.linspace(0, len(df) - 1, min(sample, len(df))).astype(int)
+
+    def end_to_end():
+        cache = pipeline.StageCache()
+        processed = pipeline.process_data(df, cache=cache, **p)
+        pipeline.run_backtest(processed, p['window'], p['pattern_backcandles'], p['pattern_window'],
+                              *BACKTEST_PARAMS, cache=cache)
+
+    return [
+        ('calculate_ema', 1, lambda: indicators.calculate_ema(df, p['ema_period'])),
+        ('detect_ema_signals', 1, lambda: indicators.detect_ema_signals(ema_df, 'EMA', p['backcandles'])),
+        ('is_pivot', len(candles), lambda: [indicators.is_pivot(df, i, p['window']) for i in candles]),
+        ('detect_pivots', 1, lambda: indicators.detect_pivots(df['High'], df['Low'], p['window'])),
+        ('detect_structure', len(candles), lambda: [
+            indicators.detect_structure(full, i, p['pattern_backcandles'], p['pattern_window']) for i in candles]),
+        ('detect_patterns', 1, lambda: indicators.detect_patterns(
+            df['Close'], df['High'], df['Low'], full['isPivot'], p['pattern_backcandles'], p['pattern_window'])),
+        ('generate_signals', 1, lambda: indicators.generate_signals(full)),
+        ('backtest_strategy', 1, lambda: backtest_strategy(full, *BACKTEST_PARAMS)),
+        ('process_data+backtest', 1, end_to_end),
+    ]
+
+def run(sizes, seed, repeat, sample):
+    results = []
+    for n in sizes:
+        df = synthetic_ohlcv(n, seed=seed)
+        for name, calls, func in stages(df, sample):
+            seconds, peak = measure(func, repeat)
+            results.append({
+                'stage': name,
+                'bars': n,
+                'calls': calls,
+                'seconds': seconds,
+                'seconds_per_call': seconds / calls,
+                'peak_bytes': peak,
+            })
+            print(f"{name:>24} {n:>10,d} bars  {seconds * 1000:10.2f} ms  {peak / 2 ** 20:9.1f} MiB peak")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark indicator and backtest stages on synthetic OHLCV data")
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e4, 1e5, 1e6],
+                        help="series lengths in bars (up to 1e7)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage, best is kept")
+    parser.add_argument('--sample', type=int, default=1000, help="candles sampled for per-candle functions")
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes]
+    results = run(sizes, args.seed, args.repeat, args.sample)
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'seed': args.seed,
+        'params': PARAMS,
+        'backtest_params': BACKTEST_PARAMS,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Run the trend breakout pipeline and backtest without the Streamlit UI
+
+    python cli.py AAPL MSFT EURUSD=X --start 2024-01-01 --interval 1d --output-dir results
+
+Writes one trade file per ticker and a summary file with the same metrics
+the app shows. Heavy modules are imported only once the arguments are
+parsed, so --help returns immediately.
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import date, timedelta
+from importlib.util import find_spec
+
+logger = logging.getLogger('trend_breakout')
+
+# Function to parse the command line; defaults mirror the app's sidebar
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the trend breakout strategy for one or more tickers")
+    parser.add_argument('tickers', nargs='+', help="Stock/Forex symbols, e.g. AAPL or EURUSD=X")
+    parser.add_argument('--start', type=date.fromisoformat, default=date.today() - timedelta(days=60))
+    parser.add_argument('--end', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--interval', default='1d', help="bar interval, e.g. 5m, 1h or 1d")
+
+    strategy = parser.add_argument_group("strategy parameters")
+    strategy.add_argument('--window', type=int, default=10, help="pivot point window")
+    strategy.add_argument('--backcandles', type=int, default=15, help="backcandles for the EMA signal")
+    strategy.add_argument('--ema-period', type=int, default=150)
+    strategy.add_argument('--pattern-backcandles', type=int, default=60)
+    strategy.add_argument('--pattern-window', type=int, default=11)
+
+    risk = parser.add_argument_group("risk management")
+    risk.add_argument('--initial-balance', type=float, default=10000.0)
+    risk.add_argument('--risk', type=float, default=2.0, help="risk percentage per trade")
+    risk.add_argument('--stop-loss', type=float, default=2.5, help="stop loss percentage")
+    risk.add_argument('--take-profit', type=float, default=5.0, help="take profit percentage")
+    risk.add_argument('--intrabar', action='store_true',
+                      help="check the stop and target against each bar's high and low instead of its close")
+    risk.add_argument('--both-touched', choices=['stop', 'target'], default='stop',
+                      help="which level fills when a bar's range touches both (with --intrabar)")
+
+    output = parser.add_argument_group("output")
+    output.add_argument('--output-dir', default='.')
+    output.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    output.add_argument('--quiet', action='store_true', help="only report errors")
+    output.add_argument('--profile', metavar='PATH', help="write per-stage timings and memory as JSON")
+    output.add_argument('--profile-detail', action='store_true',
+                        help="also trace allocations and log the top cProfile entries (slower)")
+    args = parser.parse_args(argv)
+
+    # Fail before any download rather than on the first write
+    if args.format == 'parquet' and not (find_spec('pyarrow') or find_spec('fastparquet')):
+        parser.error("--format parquet needs pyarrow or fastparquet installed; use --format csv or install one")
+    return args
+
+# Function to write a frame in the chosen format
+def write_frame(df, path, fmt):
+    if fmt == 'parquet':
+        df.to_parquet(path)
+    else:
+        df.to_csv(path)
+
+# Function to summarize a backtest with the metrics shown in the app
+def summarize(ticker, trades_df, final_balance, initial_balance, bars):
+    total_trades = len(trades_df)
+    winning_trades = int((trades_df['Profit/Loss Amount'] > 0).sum())
+    return {
+        'Ticker': ticker,
+        'Bars': bars,
+        'Total Trades': total_trades,
+        'Win Rate': winning_trades / total_trades * 100 if total_trades else 0.0,
+        'Total Profit/Loss': float(trades_df['Profit/Loss Amount'].sum()),
+        'Return': (final_balance - initial_balance) / initial_balance * 100,
+        'Final Balance': final_balance,
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.ERROR if args.quiet else logging.INFO, format='%(message)s')
+
+    import pandas as pd
+    import pipeline
+    from data_handler import get_data
+    from profiling import Profiler
+
+    profiler = None
+    if args.profile or args.profile_detail:
+        profiler = Profiler(detailed=args.profile_detail, cprofile=args.profile_detail)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    summaries = []
+    failed = []
+    for ticker in args.tickers:
+        if profiler is not None:
+            with profiler.stage(f'download {ticker}') as record:
+                df = get_data(ticker, args.start, args.end, args.interval)
+                record['rows'] = None if df is None else len(df)
+        else:
+            df = get_data(ticker, args.start, args.end, args.interval)
+        if df is None:
+            failed.append(ticker)
+            continue
+
+        df = pipeline.process_data(df, args.ema_period, args.backcandles, args.window,
+                                   args.pattern_backcandles, args.pattern_window, profiler=profiler)
+        trades_df, final_balance = pipeline.run_backtest(
+            df, args.window, args.pattern_backcandles, args.pattern_window,
+            args.initial_balance, args.risk, args.stop_loss, args.take_profit, profiler=profiler,
+            intrabar=args.intrabar, both_touched=args.both_touched)
+
+        write_frame(trades_df, os.path.join(args.output_dir, f"{ticker}_trades.{args.format}"), args.format)
+        summary = summarize(ticker, trades_df, final_balance, args.initial_balance, len(df))
+        summaries.append(summary)
+        logger.info(f"{ticker}: {summary['Total Trades']} trades, return {summary['Return']:.2f}%")
+
+    if summaries:
+        summary_df = pd.DataFrame(summaries).set_index('Ticker')
+        write_frame(summary_df, os.path.join(args.output_dir, f"summary.{args.format}"), args.format)
+    if profiler is not None:
+        if args.profile:
+            profiler.to_json(args.profile)
+        if args.profile_detail:
+            logger.info(profiler.stats_text())
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,146 @@
-import streamlit as st
-import yfinance as yf
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 
-def get_data(ticker, start_date, end_date, interval):
+from data_store import OHLCVStore
+from downloader import DAILY_INTERVALS, RetryingDownloader, TransientError
+from resample import ResampleCache
+
+logger = logging.getLogger(__name__)
+
+# Longest range Yahoo Finance serves in one request, in days, by interval
+MAX_REQUEST_DAYS = {'1m': 7}
+
+# Download pacing shared by every thread of a process: requests per second,
+# burst size and retries of transient failures
+REQUESTS_PER_SECOND = 2.0
+REQUEST_BURST = 4
+RETRIES = 3
+
+# Function to download bars straight from Yahoo Finance
+def download_yfinance(ticker, start_date, end_date, interval):
+    """
+    Uses Ticker.history, which unlike yf.download keeps no module-level
+    state, so several threads can download at once over yfinance's shared
+    session. Rate limiting is raised as TransientError so it is retried.
+    Returns: OHLCV DataFrame like yf.download's, or None if there are no bars
+    """
+    # Imported here so scripted use only pays for yfinance when it downloads
+    import yfinance as yf
+    from yfinance.exceptions import YFPricesMissingError, YFRateLimitError, YFTickerMissingError, YFTzMissingError
+    source = yf.Ticker(ticker)
+    
+    # Split longer ranges into requests Yahoo Finance accepts
+    span = MAX_REQUEST_DAYS.get(interval)
+    parts = []
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    while start < end:
+        stop = end if span is None else min(start + pd.Timedelta(days=span), end)
+        try:
+            parts.append(source.history(start=start, end=stop, interval=interval, raise_errors=True))
+        except YFRateLimitError as e:
+            raise TransientError(str(e))
+        except (YFPricesMissingError, YFTickerMissingError, YFTzMissingError):
+            # No bars in this part of the range
+            pass
+        start = stop
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return None
+    
+    data = pd.concat(parts)[['Open', 'High', 'Low', 'Close', 'Volume']]
+    # yf.download drops the timezone of daily and longer bars
+    if interval in DAILY_INTERVALS:
+        data.index = data.index.tz_localize(None)
+    return data
+
+# Local store shared by every get_data call, created on first use
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        downloader = RetryingDownloader(download_yfinance, REQUESTS_PER_SECOND, REQUEST_BURST, RETRIES)
+        _store = OHLCVStore(downloader)
+    return _store
+
+# Resampled intervals over the local store, created on first use
+_resampler = None
+
+def get_resampler():
+    global _resampler
+    if _resampler is None:
+        _resampler = ResampleCache(get_store())
+    return _resampler
+
+# Resampled intervals over the local store that never download, created on first use
+_stored = None
+
+# Function standing in for a downloader when only stored bars may be read
+def _no_download(ticker, start_date, end_date, interval):
+    return None
+
+# Function to read bars from the local store without downloading
+def get_stored(ticker, start_date, end_date, interval):
+    """
+    For worker processes, which would each bring their own rate limit if they
+    downloaded; fetch in the parent with get_many first, which reports the
+    errors, so they are not reported again here
+    Returns: OHLCV DataFrame of the stored bars in the range, or None if
+    there are none or they can't be read
+    """
+    global _stored
+    if _stored is None:
+        _stored = ResampleCache(OHLCVStore(_no_download, root=get_store().root))
     try:
-        data = yf.download(ticker, start=start_date, end=end_date, interval=interval)
-        if data.empty:
-            st.error(f"No data found for {ticker} with the specified parameters.")
+        return _stored.get(ticker, start_date, end_date, interval)
+    except Exception:
+        return None
+
+def get_data(ticker, start_date, end_date, interval, on_error=None):
+    """
+    Bars are downloaded once at a base interval and coarser intervals are
+    resampled locally (see resample.ResampleCache)
+    Returns: OHLCV DataFrame, or None after reporting the problem through
+    on_error (e.g. st.error) or, by default, the module logger
+    """
+    report = on_error or logger.error
+    try:
+        data = get_resampler().get(ticker, start_date, end_date, interval)
+        if data is None:
+            report(f"No data found for {ticker} with the specified parameters.")
             return None
         return data
     except Exception as e:
-        st.error(f"Error fetching data: {e}")
+        report(f"Error fetching data: {e}")
         return None
+
+# Function to load many tickers concurrently
+def get_many(tickers, start_date, end_date, interval, max_workers=8, source=None):
+    """
+    Downloads run on a thread pool and share the store's rate limit and
+    retries; each ticker is cached in the local store as it arrives
+    source: anything with get(ticker, start, end, interval), by default the
+    shared ResampleCache over the local store
+    Yields: (ticker, DataFrame or None, error message or None) in order of completion
+    """
+    source = source or get_resampler()
+    
+    def fetch(ticker):
+        try:
+            data = source.get(ticker, start_date, end_date, interval)
+        except Exception as e:
+            return ticker, None, f"Error fetching data: {e}"
+        if data is None:
+            return ticker, None, f"No data found for {ticker} with the specified parameters."
+        return ticker, data, None
+    
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [pool.submit(fetch, ticker) for ticker in tickers]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Stop queued downloads if the caller stops early
+        pool.shutdown(cancel_futures=True)
@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+# Default location and size cap of the local store
+DEFAULT_STORE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'trend-breakout', 'ohlcv')
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.npy'
+
+# Function to bring a downloaded frame into the stored layout
+def normalize_ohlcv(data):
+    """
+    Flatten yfinance's (Price, Ticker) column MultiIndex, sort and de-duplicate
+    the index and name it 'Date' for both daily and intraday intervals
+    """
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.set_axis(data.columns.get_level_values(0), axis=1)
+    data = data[~data.index.duplicated(keep='last')].sort_index()
+    data.index.name = 'Date'
+    return data
+
+# Function to convert a date bound to UTC nanoseconds in the index's timezone
+def _to_ns(value, tz):
+    stamp = pd.Timestamp(value)
+    if tz is not None:
+        stamp = stamp.tz_localize(tz) if stamp.tzinfo is None else stamp.tz_convert(tz)
+    elif stamp.tzinfo is not None:
+        stamp = stamp.tz_localize(None)
+    return stamp.value
+
+class OHLCVStore:
+    """
+    On-disk OHLCV cache keyed by ticker and interval
+    Each series is a directory of .npy columns read back memory-mapped, plus a
+    meta.json recording the date range already fetched. Requests download
+    only the parts of the range not covered yet, and the least recently used
+    series are evicted once the store grows past max_bytes.
+    downloader(ticker, start, end, interval) returns a DataFrame of OHLCV bars
+    with end exclusive, like yf.download.
+    """
+
+    def __init__(self, downloader, root=DEFAULT_STORE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.downloader = downloader
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker, interval):
+        return os.path.join(self.root, quote(ticker, safe=''), interval)
+
+    def _read_meta(self, path):
+        try:
+            with open(os.path.join(path, META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, path, meta):
+        tmp = os.path.join(path, META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, META_FILE))
+
+    def coverage(self, ticker, interval):
+        """
+        Returns: (start, end) Timestamps of the range already fetched, or None
+        """
+        meta = self._read_meta(self._path(ticker, interval))
+        if meta is None:
+            return None
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def read_arrays(self, ticker, interval):
+        """
+        Zero-copy view of a stored series
+        Returns: (meta, dict of read-only memory-mapped arrays including 'index'
+        as UTC nanoseconds), or (None, None) if the series is not stored
+        """
+        path = self._path(ticker, interval)
+        meta = self._read_meta(path)
+        if meta is None:
+            return None, None
+        arrays = {'index': np.load(os.path.join(path, INDEX_FILE), mmap_mode='r')}
+        for column in meta['columns']:
+            arrays[column] = np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r')
+        return meta, arrays
+
+    def _frame(self, meta, arrays, start_ns=None, end_ns=None):
+        index = arrays['index']
+        lo = 0 if start_ns is None else np.searchsorted(index, start_ns, side='left')
+        hi = len(index) if end_ns is None else np.searchsorted(index, end_ns, side='left')
+        dates = pd.DatetimeIndex(np.asarray(index[lo:hi]).view('M8[ns]'), name='Date')
+        if meta['tz'] is not None:
+            dates = dates.tz_localize('UTC').tz_convert(meta['tz'])
+        # copy=False keeps the columns as plain ndarray views of the memory maps
+        columns = {column: np.asarray(arrays[column][lo:hi]) for column in meta['columns']}
+        return pd.DataFrame(columns, index=dates, copy=False)
+
+    def _write_series(self, path, data, meta):
+        os.makedirs(path, exist_ok=True)
+        index = data.index
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        columns = {'index': index.asi8}
+        columns.update({column: data[column].to_numpy() for column in data.columns})
+        nbytes = 0
+        for name, values in columns.items():
+            filename = INDEX_FILE if name == 'index' else f'{name}.npy'
+            tmp = os.path.join(path, filename + '.tmp.npy')
+            np.save(tmp, values)
+            # Replacing the file keeps earlier memory maps valid on the old inode
+            os.replace(tmp, os.path.join(path, filename))
+            nbytes += os.path.getsize(os.path.join(path, filename))
+        meta.update(columns=list(data.columns), nbytes=nbytes)
+
+    def update(self, ticker, interval, data, start, end):
+        """
+        Merge freshly downloaded bars for [start, end) into the stored series
+        """
+        with self._lock:
+            path = self._path(ticker, interval)
+            meta, arrays = self.read_arrays(ticker, interval)
+            data = normalize_ohlcv(data)
+            if meta is not None:
+                stored = self._frame(meta, arrays)
+                data = normalize_ohlcv(pd.concat([stored, data.reindex(columns=stored.columns)]))
+                start = min(pd.Timestamp(start), pd.Timestamp(meta['start']))
+                end = max(pd.Timestamp(end), pd.Timestamp(meta['end']))
+            meta = {
+                'ticker': ticker,
+                'interval': interval,
+                'tz': None if data.index.tz is None else str(data.index.tz),
+                'start': pd.Timestamp(start).isoformat(),
+                # Bars of the current day may still change, so never mark it covered
+                'end': min(pd.Timestamp(end), pd.Timestamp.now().normalize()).isoformat(),
+                'last_access': time.time(),
+            }
+            self._write_series(path, data, meta)
+            self._write_meta(path, meta)
+            self._evict(keep=path)
+
+    def get(self, ticker, start, end, interval):
+        """
+        Bars for [start, end), downloading only the ranges not stored yet
+        Returns: DataFrame backed by the memory-mapped store, or None if empty
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        with self._lock:
+            path = self._path(ticker, interval)
+            meta = self._read_meta(path)
+            if meta is None:
+                missing = [(start, end)]
+            else:
+                missing = []
+                if start < pd.Timestamp(meta['start']):
+                    missing.append((start, pd.Timestamp(meta['start'])))
+                if end > pd.Timestamp(meta['end']):
+                    missing.append((pd.Timestamp(meta['end']), end))
+
+        # Download without holding the lock so other series can load concurrently
+        for fetch_start, fetch_end in missing:
+            data = self.downloader(ticker, fetch_start, fetch_end, interval)
+            # An empty answer may be a silent failure, so it is not cached
+            if data is not None and not data.empty:
+                self.update(ticker, interval, data, fetch_start, fetch_end)
+
+        with self._lock:
+            meta, arrays = self.read_arrays(ticker, interval)
+            if meta is None:
+                return None
+            meta['last_access'] = time.time()
+            self._write_meta(path, meta)
+
+        data = self._frame(meta, arrays, _to_ns(start, meta['tz']), _to_ns(end, meta['tz']))
+        return None if data.empty else data
+
+    def _evict(self, keep=None):
+        """
+        Drop least recently used series until the store fits in max_bytes
+        """
+        entries = []
+        for ticker_dir in os.listdir(self.root):
+            for interval in os.listdir(os.path.join(self.root, ticker_dir)):
+                path = os.path.join(self.root, ticker_dir, interval)
+                meta = self._read_meta(path)
+                if meta is not None:
+                    entries.append((meta['last_access'], meta['nbytes'], path))
+
+        total = sum(nbytes for _, nbytes, _ in entries)
+        for _, nbytes, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+            total -= nbytes
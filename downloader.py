@@ -0,0 +1,73 @@
+import random
+import threading
+import time
+
+# Intervals whose bars are whole days, labelled with the exchange date
+DAILY_INTERVALS = ('1d', '5d', '1wk', '1mo', '3mo')
+
+class TransientError(Exception):
+    """
+    A failure worth retrying (rate limited, server error, dropped connection)
+    retry_after: seconds the server asked to wait, if it said
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """
+    Token bucket shared by every download thread
+    Allows `rate` requests per second on average and bursts of up to `burst`
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Taking the token up front queues concurrent callers in order
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+
+class RetryingDownloader:
+    """
+    Wraps a transport(ticker, start, end, interval) -> DataFrame or None with
+    a shared rate limit and retries with exponential backoff and jitter
+    Only TransientError and connection errors (OSError) are retried; anything
+    else is a permanent failure and raised at once. Instances are callables
+    with the transport's signature, so they plug into OHLCVStore directly.
+    """
+
+    def __init__(self, transport, rate=2.0, burst=4, retries=3, backoff=1.0, max_backoff=30.0, sleep=time.sleep):
+        self.transport = transport
+        self.limiter = RateLimiter(rate, burst, sleep=sleep) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+
+    def __call__(self, ticker, start_date, end_date, interval):
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                return self.transport(ticker, start_date, end_date, interval)
+            except (TransientError, OSError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = min(self.backoff * 2 ** attempt, self.max_backoff) * (1 + random.random())
+                if getattr(e, 'retry_after', None):
+                    delay = max(delay, e.retry_after)
+                self._sleep(delay)
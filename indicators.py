@@ -5,33 +5,150 @@ import numpy as np
 def calculate_ema(df, period):
     return df['Close'].ewm(span=period, adjust=False).mean()
 
+# Function to pull a column out as a flat float array
+def _column(df, name):
+    # yfinance can return single-ticker frames with MultiIndex columns, in which
+    # case df[name] is a one-column DataFrame rather than a Series
+    return np.asarray(df[name], dtype=float).reshape(-1)
+
+# Function to flag windows of `width` consecutive values containing any True
+def _rolling_any(flags, width):
+    counts = np.cumsum(flags, dtype=np.int64)
+    counts[width:] = counts[width:] - counts[:-width]
+    return counts > 0
+
 # Function to detect EMA signals
 def detect_ema_signals(df, ema_col, backcandles):
-    EMAsignal = [0] * len(df)
-    
-    for row in range(backcandles, len(df)):
-        upt = 1
-        dnt = 1
-        for i in range(row-backcandles, row+1):
-            # Fix the comparison by using direct values instead of __nonzero__
-            open_val = df['Open'].values[i]
-            close_val = df['Close'].values[i]
-            ema_val = df[ema_col].values[i]
-            
-            if max(open_val, close_val) >= ema_val:
-                dnt = 0
-            if min(open_val, close_val) <= ema_val:
-                upt = 0
-                
-        if upt == 1 and dnt == 1:
-            EMAsignal[row] = 3  # Neither touching the EMA
-        elif upt == 1:
-            EMAsignal[row] = 2  # All candles above EMA
-        elif dnt == 1:
-            EMAsignal[row] = 1  # All candles below EMA
+    """
+    Classify each candle by where the last backcandles + 1 candle bodies sit
+    relative to the EMA
+    Returns: int8 array with 1 if all bodies are below the EMA, 2 if all are
+    above, 3 if neither touches it (only possible with missing values), 0 otherwise
+    """
+    open_prices = _column(df, 'Open')
+    close_prices = _column(df, 'Close')
+    ema = _column(df, ema_col)
+    
+    EMAsignal = np.zeros(len(ema), dtype=np.int8)
+    if backcandles >= len(ema):
+        return EMAsignal
+    
+    # All bodies below the EMA means the rolling max of (body top - EMA) stays
+    # below zero; counting the candles that break the rule over a sliding
+    # window gives the same answer in O(n); NaN comparisons never count as a break
+    # Body top and bottom follow Python's max(open, close)/min(open, close):
+    # the open wins unless the close compares past it, so a NaN close leaves
+    # the open in place while a NaN open makes the body NaN
+    top = np.where(close_prices > open_prices, close_prices, open_prices)
+    bottom = np.where(close_prices < open_prices, close_prices, open_prices)
+    width = backcandles + 1
+    breaks_down = _rolling_any(top >= ema, width)
+    breaks_up = _rolling_any(bottom <= ema, width)
+    
+    dnt = ~breaks_down[backcandles:]
+    upt = ~breaks_up[backcandles:]
+    EMAsignal[backcandles:] = np.where(upt & dnt, 3, np.where(upt, 2, np.where(dnt, 1, 0)))
     
     return EMAsignal
 
+# Function to compute a sliding max/min over windows of `width` values
+def _sliding_extreme(values, width, func, fill):
+    """
+    van Herk/Gil-Werman sliding extremum: O(n) regardless of width
+    func is np.fmax or np.fmin (NaNs are skipped), fill the matching identity
+    Returns: array of len(values) - width + 1, element k covering values[k:k + width]
+    """
+    n = len(values)
+    padded_len = -(-n // width) * width
+    padded = np.full(padded_len, fill)
+    padded[:n] = values
+    
+    # Running extremes from the start and from the end of each block
+    blocks = padded.reshape(-1, width)
+    prefix = func.accumulate(blocks, axis=1).reshape(-1)
+    suffix = func.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1)
+    
+    # Any window spans the tail of one block and the head of the next
+    return func(suffix[:n - width + 1], prefix[width - 1:n])
+
+# Function to detect pivot points for the whole series at once
+def detect_pivots(high, low, window):
+    """
+    Batch version of is_pivot over arrays of highs and lows
+    Returns: int8 array with 1 for pivot high, 2 for pivot low, 3 for both, 0 for neither
+    """
+    high = np.asarray(high, dtype=float).reshape(-1)
+    low = np.asarray(low, dtype=float).reshape(-1)
+    
+    pivots = np.zeros(len(high), dtype=np.int8)
+    width = 2 * window + 1
+    if len(high) < width:
+        return pivots
+    
+    # A candle is a pivot high unless a neighbour is strictly higher, so ties
+    # still count and a NaN candle or NaN neighbours never disqualify it
+    window_high = _sliding_extreme(high, width, np.fmax, -np.inf)
+    window_low = _sliding_extreme(low, width, np.fmin, np.inf)
+    center = slice(window, len(high) - window)
+    pivot_high = ~(high[center] < window_high)
+    pivot_low = ~(low[center] > window_low)
+    pivots[center] = pivot_high * 1 + pivot_low * 2
+    
+    return pivots
+
+# Function to find how far each value stays the maximum of its neighbourhood
+def _dominance_radius(values, max_radius):
+    """
+    Largest r <= max_radius such that values[i] has at least r neighbours on
+    each side and none of values[i - r:i + r + 1] is strictly greater
+    (NaNs are skipped, matching detect_pivots)
+    Uses a sparse table of power-of-two range maxima and a per-candle binary
+    search on r, all vectorized: O(n log max_radius) time and memory
+    """
+    n = len(values)
+    positions = np.arange(n)
+    limit = np.minimum(np.minimum(positions, n - 1 - positions), max_radius)
+    radius = np.zeros(n, dtype=np.int32)
+    if n == 0 or limit.max() <= 0:
+        return radius
+    
+    # table[k, j] = max(values[j:j + 2**k]), wide enough for windows of 2 * max r + 1
+    levels = int(2 * limit.max() + 1).bit_length()
+    table = np.full((levels, n), -np.inf)
+    table[0] = np.where(np.isnan(values), -np.inf, values)
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        table[k, :n - half] = np.fmax(table[k - 1, :n - half], table[k - 1, half:])
+    
+    # Try radius + 2**k from the largest power down, keeping it where it still holds
+    for k in reversed(range(int(limit.max()).bit_length())):
+        candidate = radius + (1 << k)
+        idx = np.flatnonzero(candidate <= limit)
+        r = candidate[idx]
+        level = np.log2(2 * r + 1).astype(np.int64)
+        window_max = np.fmax(table[level, idx - r], table[level, idx + r - (1 << level) + 1])
+        holds = ~(values[idx] < window_max)
+        radius[idx[holds]] = r[holds]
+    return radius
+
+# Function to precompute pivot radii for every window at once
+def pivot_radii(high, low, max_radius=64):
+    """
+    For each candle, the largest window (up to max_radius) for which it is a
+    pivot high and a pivot low; detect_pivots(high, low, w) equals
+    pivots_from_radii(high_radius, low_radius, w) for any w <= max_radius
+    Returns: (high_radius, low_radius) int32 arrays
+    """
+    high = np.asarray(high, dtype=float).reshape(-1)
+    low = np.asarray(low, dtype=float).reshape(-1)
+    return _dominance_radius(high, max_radius), _dominance_radius(-low, max_radius)
+
+# Function to read the pivot column for one window off the precomputed radii
+def pivots_from_radii(high_radius, low_radius, window):
+    pivots = (low_radius >= window).astype(np.int8) * np.int8(2)
+    pivots += high_radius >= window
+    return pivots
+
 # Function to detect pivot points
 def is_pivot(df, candle_index, window):
     """
@@ -41,30 +158,72 @@ def is_pivot(df, candle_index, window):
     if candle_index - window < 0 or candle_index + window >= len(df):
         return 0
     
-    # Get values directly instead of using .iloc
-    current_high = df['High'].values[candle_index]
-    current_low = df['Low'].values[candle_index]
-    
-    pivot_high = 1
-    pivot_low = 2
-    
-    # Check surrounding candles
-    for i in range(candle_index - window, candle_index + window + 1):
-        if i == candle_index:  # Skip comparison with itself
-            continue
-        if current_low > df['Low'].values[i]:
-            pivot_low = 0
-        if current_high < df['High'].values[i]:
-            pivot_high = 0
-    
-    if pivot_high and pivot_low:
-        return 3
-    elif pivot_high:
-        return pivot_high
-    elif pivot_low:
-        return pivot_low
-    else:
-        return 0
+    # Only the candle's own neighbourhood is needed
+    neighbours = slice(candle_index - window, candle_index + window + 1)
+    pivots = detect_pivots(_column(df, 'High')[neighbours], _column(df, 'Low')[neighbours], window)
+    return int(pivots[window])
+
+# Function to find, per candle, the last three pivots of one kind in its lookback
+def _pivot_zones(values, positions, candles, backcandles, window, zone_width):
+    """
+    For each candle c take the last 3 pivots with positions in
+    [c - backcandles - window, c - window) and test whether they form a zone
+    Returns: (zone found, zone mean) arrays aligned with candles
+    """
+    found = np.zeros(len(candles), dtype=bool)
+    means = np.zeros(len(candles))
+    if len(positions) < 3:
+        return found, means
+    
+    # Pivot positions are sorted, so each lookback maps to a run of pivot indices
+    end = np.searchsorted(positions, candles - window)
+    start = np.searchsorted(positions, candles - backcandles - window)
+    
+    # Every run of three consecutive pivots is scored once
+    first, second, third = values[positions[:-2]], values[positions[1:-1]], values[positions[2:]]
+    zone_mean = (first + second + third) / 3
+    tight = (
+        (np.abs(first - zone_mean) <= zone_width)
+        & (np.abs(second - zone_mean) <= zone_width)
+        & (np.abs(third - zone_mean) <= zone_width)
+    )
+    
+    # The last three pivots in a lookback are the run starting at end - 3
+    has_three = end - start >= 3
+    run = np.maximum(end - 3, 0)
+    found = has_three & tight[run]
+    means = zone_mean[run]
+    return found, means
+
+# Function to detect structure patterns for the whole series at once
+def detect_patterns(close, high, low, pivots, backcandles, window, zone_width=0.001):
+    """
+    Batch version of detect_structure over arrays, using the isPivot column
+    Returns: int8 array with 0 for no pattern, 1 for support breakout, 2 for resistance breakout
+    """
+    close = np.asarray(close, dtype=float).reshape(-1)
+    high = np.asarray(high, dtype=float).reshape(-1)
+    low = np.asarray(low, dtype=float).reshape(-1)
+    pivots = np.asarray(pivots).reshape(-1)
+    
+    patterns = np.zeros(len(close), dtype=np.int8)
+    candles = np.arange(backcandles + window + 1, len(close) - window - 1)
+    if len(candles) == 0:
+        return patterns
+    
+    # Index the pivots once instead of slicing a frame per candle
+    support_found, support_mean = _pivot_zones(
+        low, np.flatnonzero(pivots == 2), candles, backcandles, window, zone_width)
+    resistance_found, resistance_mean = _pivot_zones(
+        high, np.flatnonzero(pivots == 1), candles, backcandles, window, zone_width)
+    
+    current_close = close[candles]
+    support_break = support_found & ((support_mean - current_close) > zone_width * 2)
+    resistance_break = resistance_found & ((current_close - resistance_mean) > zone_width * 2)
+    
+    # Support breakout (sell) takes precedence over resistance breakout (buy)
+    patterns[candles] = np.where(support_break, 1, np.where(resistance_break, 2, 0))
+    return patterns
 
 # Function to detect structure patterns
 def detect_structure(df, candle_index, backcandles, window):
@@ -75,46 +234,31 @@ def detect_structure(df, candle_index, backcandles, window):
     if (candle_index <= (backcandles + window)) or (candle_index + window + 1 >= len(df)):
         return 0
     
-    # Get local data segment without looking ahead
-    local_df = df.iloc[candle_index - backcandles - window:candle_index - window].copy()
-    
-    # Get the last 3 pivot highs and lows
-    highs = local_df[local_df['isPivot'] == 1]['High'].tail(3).values
-    lows = local_df[local_df['isPivot'] == 2]['Low'].tail(3).values
-    
-    zone_width = 0.001  # Tolerance for pattern detection
-    current_close = df['Close'].values[candle_index]
-    
-    # Check for support breakout (three similar lows broken downward)
-    if len(lows) == 3:
-        mean_low = lows.mean()
-        support_condition = all(abs(low - mean_low) <= zone_width for low in lows)
-        
-        if support_condition and (mean_low - current_close) > zone_width * 2:
-            return 1  # Support breakout (sell signal)
+    # Smallest segment around the candle that keeps it inside the valid range
+    segment = slice(candle_index - backcandles - window - 1, candle_index + window + 2)
+    patterns = detect_patterns(
+        _column(df, 'Close')[segment],
+        _column(df, 'High')[segment],
+        _column(df, 'Low')[segment],
+        np.asarray(df['isPivot']).reshape(-1)[segment],
+        backcandles,
+        window,
+    )
+    return int(patterns[backcandles + window + 1])
 
-    # Check for resistance breakout (three similar highs broken upward)
-    if len(highs) == 3:
-        mean_high = highs.mean()
-        resistance_condition = all(abs(high - mean_high) <= zone_width for high in highs)
-        
-        if resistance_condition and (current_close - mean_high) > zone_width * 2:
-            return 2  # Resistance breakout (buy signal)
-            
-    return 0  # No pattern detected
+# Function to combine pivot and pattern codes into trading signals
+def combine_signals(pivots, patterns):
+    """
+    Returns: int8 array with 1 for buy (pivot low or resistance breakout), -1
+    for sell (pivot high or support breakout), 0 otherwise; buy wins if both fire
+    """
+    pivots = np.asarray(pivots).reshape(-1)
+    patterns = np.asarray(patterns).reshape(-1)
+    signals = np.zeros(len(pivots), dtype=np.int8)
+    signals[(pivots == 1) | (patterns == 1)] = -1
+    signals[(pivots == 2) | (patterns == 2)] = 1
+    return signals
 
 # Function to generate trading signals
 def generate_signals(df):
-    # Combine signals from pivot points and pattern detection
-    signals = [0] * len(df)
-    
-    for i in range(len(df)):
-        # Buy signal: Pivot low or resistance breakout
-        if df['isPivot'].values[i] == 2 or df['pattern_detected'].values[i] == 2:
-            signals[i] = 1  # Buy
-        
-        # Sell signal: Pivot high or support breakout
-        elif df['isPivot'].values[i] == 1 or df['pattern_detected'].values[i] == 1:
-            signals[i] = -1  # Sell
-    
-    return signals
\ No newline at end of file
+    return combine_signals(df['isPivot'], df['pattern_detected'])
\ No newline at end of file
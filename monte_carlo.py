@@ -0,0 +1,97 @@
+import numpy as np
+
+# Cells (paths x trades) simulated at once; about 16 MB per float64 array
+CHUNK_CELLS = 2_000_000
+
+# Function to turn a trade log into per-trade returns on the account
+def trade_returns(trades):
+    """
+    trades: columnar trade log from simulate_trades, or a trades DataFrame
+    (either has the P/L amount and the balance after each trade)
+    With risk-percentage sizing a trade's P/L is proportional to the balance
+    it was opened with, so P/L / balance before is what compounds.
+    Returns: array of per-trade fractional returns
+    """
+    if 'profit_loss_amount' in trades:
+        amount, balance = trades['profit_loss_amount'], trades['balance']
+    else:
+        amount, balance = trades['Profit/Loss Amount'], trades['Balance']
+    amount = np.asarray(amount, dtype=float)
+    balance = np.asarray(balance, dtype=float)
+    return amount / (balance - amount)
+
+# Function to simulate many reorderings of a trade sequence
+def simulate_paths(returns, initial_balance, n_paths=10000, method='bootstrap', n_trades=None, risk_scale=1.0,
+                   seed=None, chunk_cells=CHUNK_CELLS):
+    """
+    returns: per-trade returns as from trade_returns
+    method: 'bootstrap' draws n_trades returns with replacement per path,
+    'shuffle' permutes the original sequence (n_trades is then its length)
+    risk_scale: resize every trade as if risk_percentage had been multiplied
+    by it, since P/L scales linearly with the risk taken
+    Paths are built as 2-D arrays of compounded balances, chunk_cells cells
+    at a time so memory stays bounded for any number of paths.
+    Returns: dict of per-path arrays 'final_balance', 'min_balance' and
+    'max_drawdown' (0-100)
+    """
+    growth = 1 + np.asarray(returns, dtype=float) * risk_scale
+    if method == 'shuffle' or n_trades is None:
+        n_trades = len(growth)
+    if method not in ('bootstrap', 'shuffle'):
+        raise ValueError(f"Unknown method {method!r}")
+
+    rng = np.random.default_rng(seed)
+    result = {
+        'final_balance': np.full(n_paths, float(initial_balance)),
+        'min_balance': np.full(n_paths, float(initial_balance)),
+        'max_drawdown': np.zeros(n_paths),
+    }
+    if n_trades == 0 or n_paths == 0:
+        return result
+
+    rows = max(chunk_cells // n_trades, 1)
+    for start in range(0, n_paths, rows):
+        end = min(start + rows, n_paths)
+        if method == 'bootstrap':
+            equity = growth[rng.integers(0, len(growth), size=(end - start, n_trades))]
+        else:
+            equity = rng.permuted(np.tile(growth, (end - start, 1)), axis=1)
+
+        # Compound in place; the starting balance counts as the first peak
+        np.cumprod(equity, axis=1, out=equity)
+        equity *= initial_balance
+        peaks = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peaks, initial_balance, out=peaks)
+
+        result['final_balance'][start:end] = equity[:, -1]
+        result['min_balance'][start:end] = np.minimum(equity.min(axis=1), initial_balance)
+        result['max_drawdown'][start:end] = np.max((peaks - equity) / peaks, axis=1) * 100
+    return result
+
+# Function to summarize the simulated distributions
+def summarize_paths(paths, initial_balance, ruin_level=50.0, percentiles=(5, 50, 95)):
+    """
+    ruin_level: loss of the starting balance, in percent, that counts as ruin
+    Returns: dict of metrics (percentages as 0-100)
+    """
+    final_balance = paths['final_balance']
+    summary = {
+        'Paths': len(final_balance),
+        'Mean Final Balance': float(final_balance.mean()),
+    }
+    for q, value in zip(percentiles, np.percentile(final_balance, percentiles)):
+        summary[f'Final Balance P{q}'] = float(value)
+    for q, value in zip(percentiles, np.percentile(paths['max_drawdown'], percentiles)):
+        summary[f'Max Drawdown P{q}'] = float(value)
+    summary['Probability of Loss'] = float(np.mean(final_balance < initial_balance)) * 100
+    summary['Risk of Ruin'] = float(np.mean(paths['min_balance'] <= initial_balance * (1 - ruin_level / 100))) * 100
+    return summary
+
+# Function to run the Monte Carlo analysis for one backtest
+def monte_carlo(trades, initial_balance, n_paths=10000, method='bootstrap', n_trades=None, risk_scale=1.0,
+                ruin_level=50.0, seed=None):
+    """
+    Returns: (summary dict as from summarize_paths, per-path arrays)
+    """
+    paths = simulate_paths(trade_returns(trades), initial_balance, n_paths, method, n_trades, risk_scale, seed)
+    return summarize_paths(paths, initial_balance, ruin_level), paths
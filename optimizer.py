@@ -0,0 +1,167 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from indicators import pivot_radii, pivots_from_radii, detect_patterns, combine_signals
+from backtester import simulate_trades
+from analytics import equity_curve, performance_metrics
+
+# Parameters that influence the backtest, with the sidebar defaults from app.py.
+# ema_period and backcandles only feed the EMASignal column, which does not
+# drive the trading signal, so sweeping them would just repeat results.
+SWEEP_PARAMETERS = {
+    'window': 10,
+    'pattern_backcandles': 60,
+    'pattern_window': 11,
+    'risk_percentage': 2.0,
+    'stop_loss_percentage': 2.5,
+    'take_profit_percentage': 5.0,
+}
+
+# Parameters that decide the signal column; everything else is a backtest setting
+SIGNAL_PARAMETERS = ['window', 'pattern_backcandles', 'pattern_window']
+BACKTEST_PARAMETERS = ['risk_percentage', 'stop_loss_percentage', 'take_profit_percentage']
+
+# Arrays attached from shared memory in each worker process
+_shared = {}
+
+# Function to copy arrays into shared memory blocks
+def _share_arrays(arrays):
+    """
+    Returns: (list of SharedMemory blocks to release, specs to attach them by name)
+    """
+    blocks = []
+    specs = {}
+    for key, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        specs[key] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+# Function to attach shared arrays in a worker process
+def _attach_arrays(specs):
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        # Keep the block referenced so the buffer outlives this call
+        _shared[key] = (block, np.ndarray(shape, np.dtype(dtype), buffer=block.buf))
+
+# Function to read an array shared with this process
+def shared_array(key):
+    return _shared[key][1]
+
+# Function to run tasks against arrays shared with every worker
+def map_shared(func, tasks, arrays, max_workers=None):
+    """
+    func(task) reads the arrays through shared_array(key). With a process
+    pool the arrays are copied once into shared memory instead of being
+    pickled per task; max_workers=1 runs in the calling process.
+    Returns: list of func results in task order
+    """
+    if max_workers == 1:
+        for key, array in arrays.items():
+            _shared[key] = (None, array)
+        try:
+            return [func(task) for task in tasks]
+        finally:
+            _shared.clear()
+
+    blocks, specs = _share_arrays(arrays)
+    try:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_arrays, initargs=(specs,)) as pool:
+            return list(pool.map(func, tasks, chunksize=chunksize))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+# Function to fill in a parameter grid with the sidebar defaults
+def expand_grid(param_grid):
+    """
+    Returns: (list of signal parameter tuples, list of backtest parameter tuples)
+    """
+    unknown = set(param_grid) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+    grid = {name: sorted(set(param_grid.get(name, [default]))) for name, default in SWEEP_PARAMETERS.items()}
+    signal_grid = list(itertools.product(*(grid[name] for name in SIGNAL_PARAMETERS)))
+    backtest_grid = list(itertools.product(*(grid[name] for name in BACKTEST_PARAMETERS)))
+    return signal_grid, backtest_grid
+
+# Summary columns where a smaller value is the better result
+LOWER_IS_BETTER = {'Max Drawdown (%)'}
+
+# Function to summarize one backtest as a results row
+def summarize_trades(close, trades, final_balance, initial_balance, periods_per_year=252):
+    total_trades = len(trades['balance'])
+    winning_trades = int(np.count_nonzero(trades['profit_loss_amount'] > 0))
+    metrics = performance_metrics(equity_curve(close, trades, initial_balance), trades, periods_per_year)
+    return {
+        'Total Trades': total_trades,
+        'Win Rate (%)': winning_trades / total_trades * 100 if total_trades else 0.0,
+        'Final Balance': final_balance,
+        'Return (%)': (final_balance - initial_balance) / initial_balance * 100,
+        'Max Drawdown (%)': metrics['Max Drawdown'],
+        'Sharpe': metrics['Sharpe'],
+        'Sortino': metrics['Sortino'],
+        'Exposure (%)': metrics['Exposure'],
+    }
+
+# Function to evaluate every backtest setting for one signal configuration
+def _evaluate(task):
+    signal_params, backtest_grid, initial_balance, periods_per_year = task
+    window, pattern_backcandles, pattern_window = signal_params
+    close, high, low = shared_array('prices')
+    windows = shared_array('windows')
+    pivots = shared_array('pivots')[np.searchsorted(windows, window)]
+
+    patterns = detect_patterns(close, high, low, pivots, pattern_backcandles, pattern_window)
+    signal = combine_signals(pivots, patterns)
+
+    rows = []
+    for backtest_params in backtest_grid:
+        trades, final_balance = simulate_trades(close, signal, initial_balance, *backtest_params)
+        row = dict(zip(SIGNAL_PARAMETERS, signal_params))
+        row.update(zip(BACKTEST_PARAMETERS, backtest_params))
+        row.update(summarize_trades(close, trades, final_balance, initial_balance, periods_per_year))
+        rows.append(row)
+    return rows
+
+# Function to sweep strategy parameters over a process pool
+def run_sweep(df, param_grid, initial_balance=10000.0, max_workers=None, periods_per_year=252):
+    """
+    Backtest every combination in param_grid (name -> list of values, names
+    from SWEEP_PARAMETERS; missing names use the sidebar defaults)
+    Pivots for every window come from one pivot_radii pass and are shipped
+    to the workers through shared memory with the prices; each task builds
+    the signal for one (window, pattern_backcandles, pattern_window) and runs
+    all stop loss / take profit / risk settings against it.
+    max_workers=1 runs everything in the calling process; periods_per_year
+    annualizes Sharpe and Sortino.
+    Returns: DataFrame with one row per combination, best return first
+    """
+    signal_grid, backtest_grid = expand_grid(param_grid)
+
+    close = np.asarray(df['Close'], dtype=float).reshape(-1)
+    high = np.asarray(df['High'], dtype=float).reshape(-1)
+    low = np.asarray(df['Low'], dtype=float).reshape(-1)
+    windows = np.array(sorted({params[0] for params in signal_grid}), dtype=np.int64)
+    arrays = {
+        'prices': np.stack([close, high, low]),
+        'windows': windows,
+    }
+    # One radius precomputation answers every window in the grid
+    high_radius, low_radius = pivot_radii(high, low, max(int(windows.max()), 1))
+    arrays['pivots'] = np.stack([pivots_from_radii(high_radius, low_radius, w) for w in windows]).astype(np.int8)
+
+    tasks = [(signal_params, backtest_grid, initial_balance, periods_per_year) for signal_params in signal_grid]
+    results = map_shared(_evaluate, tasks, arrays, max_workers)
+
+    results_df = pd.DataFrame([row for rows in results for row in rows])
+    return results_df.sort_values('Return (%)', ascending=False, kind='stable').reset_index(drop=True)
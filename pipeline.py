@@ -0,0 +1,287 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from indicators import (
+    calculate_ema, detect_ema_signals, detect_pivots, pivot_radii, pivots_from_radii, detect_patterns, combine_signals
+)
+from backtester import simulate_trades, trades_to_frame
+
+class StageCache:
+    """
+    Bounded LRU cache of pipeline stage results
+    Keys are (stage name, data fingerprint, parameters the stage depends on),
+    so a parameter change only invalidates the stages downstream of it.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def cached_params(self, stage, key):
+        """
+        Returns: the parameters of every cached result of stage for the data
+        with fingerprint key
+        """
+        with self._lock:
+            return [entry[2:] for entry in self._entries if entry[:2] == (stage, key)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Cache shared by the Streamlit app and library callers that don't bring their own
+DEFAULT_CACHE = StageCache()
+
+# Function to identify a price series by content
+def fingerprint(df):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes())
+    for column in ['Open', 'High', 'Low', 'Close']:
+        digest.update(np.ascontiguousarray(df[column].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+# Function to freeze a cached array so callers can't change it under the cache
+def _frozen(array):
+    array.flags.writeable = False
+    return array
+
+# What every stage needs: the data, its fingerprint, the cache, an optional
+# Profiler and the stages already reported during this call
+_Context = namedtuple('_Context', 'df key cache profiler reported')
+
+def _context(df, cache, profiler):
+    return _Context(df, fingerprint(df), cache, profiler, set())
+
+# Function to serve a stage from cache, timing it when it has to run
+def _cached(ctx, stage, params, compute):
+    if ctx.profiler is None:
+        return ctx.cache.get_or_compute((stage, ctx.key) + params, compute)
+    
+    def timed():
+        with ctx.profiler.stage(stage, len(ctx.df)):
+            return compute()
+    misses = ctx.cache.misses
+    value = ctx.cache.get_or_compute((stage, ctx.key) + params, timed)
+    # Report each stage once per call, however many stages depend on it
+    if ctx.cache.misses == misses and (stage, params) not in ctx.reported:
+        ctx.profiler.cached(stage, len(ctx.df))
+    ctx.reported.add((stage, params))
+    return value
+
+# Stage functions: each takes the context and only its own parameters
+# The EMA column is kept as float32 for display; the EMA signal compares
+# candle bodies against the full-precision EMA, which it recomputes
+def _ema(ctx, ema_period):
+    return _cached(ctx, 'ema', (ema_period,),
+                   lambda: _frozen(calculate_ema(ctx.df, ema_period).to_numpy(dtype=np.float32).reshape(-1)))
+
+def _ema_signal(ctx, ema_period, backcandles):
+    def compute():
+        columns = {'Open': ctx.df['Open'], 'Close': ctx.df['Close'], 'EMA': calculate_ema(ctx.df, ema_period)}
+        return _frozen(detect_ema_signals(columns, 'EMA', backcandles))
+    return _cached(ctx, 'ema_signal', (ema_period, backcandles), compute)
+
+# Windows up to this size (the app's slider maximum) can be answered from one
+# radius precomputation per series
+PIVOT_RADIUS_CAP = 20
+
+def _pivot_radii(ctx):
+    def compute():
+        high_radius, low_radius = pivot_radii(ctx.df['High'], ctx.df['Low'], PIVOT_RADIUS_CAP)
+        return _frozen(high_radius), _frozen(low_radius)
+    return _cached(ctx, 'pivot_radii', (), compute)
+
+def _pivots(ctx, window):
+    # The radii cost several detect_pivots passes, so the first window asked
+    # for is detected directly and the radii are built only once a second
+    # window is asked for on the same series
+    windows = ctx.cache.cached_params('pivots', ctx.key)
+    if window <= PIVOT_RADIUS_CAP and windows and (window,) not in windows:
+        radii = _pivot_radii(ctx)
+        return _cached(ctx, 'pivots', (window,), lambda: _frozen(pivots_from_radii(*radii, window)))
+    return _cached(ctx, 'pivots', (window,),
+                   lambda: _frozen(detect_pivots(ctx.df['High'], ctx.df['Low'], window)))
+
+def _patterns(ctx, window, pattern_backcandles, pattern_window):
+    pivots = _pivots(ctx, window)
+    return _cached(ctx, 'patterns', (window, pattern_backcandles, pattern_window),
+                   lambda: _frozen(detect_patterns(
+                       ctx.df['Close'], ctx.df['High'], ctx.df['Low'], pivots, pattern_backcandles, pattern_window)))
+
+def _signal(ctx, window, pattern_backcandles, pattern_window):
+    pivots = _pivots(ctx, window)
+    patterns = _patterns(ctx, window, pattern_backcandles, pattern_window)
+    return _cached(ctx, 'signal', (window, pattern_backcandles, pattern_window),
+                   lambda: _frozen(combine_signals(pivots, patterns)))
+
+# Function to add the indicator and signal columns to a price frame
+def process_data(df, ema_period, backcandles, window, pattern_backcandles, pattern_window,
+                 cache=DEFAULT_CACHE, profiler=None):
+    """
+    Run the indicator pipeline with every stage memoized in cache; pass a
+    profiling.Profiler to time the stages that actually run
+    Returns: a new, writable frame with df's columns plus EMA (float32) and
+    the int8 EMASignal, isPivot, pattern_detected and signal columns; the
+    read-only stage arrays stay in the cache and the frame holds copies
+    """
+    ctx = _context(df, cache, profiler)
+    columns = {column: df[column].to_numpy() for column in df.columns}
+    columns.update(
+        EMA=_ema(ctx, ema_period),
+        EMASignal=_ema_signal(ctx, ema_period, backcandles),
+        isPivot=_pivots(ctx, window),
+        pattern_detected=_patterns(ctx, window, pattern_backcandles, pattern_window),
+        signal=_signal(ctx, window, pattern_backcandles, pattern_window),
+    )
+    # One copy of every column, so writes to the frame reach neither the
+    # cache nor df, which may itself be read-only memory maps from the store
+    return pd.DataFrame(columns, index=df.index, copy=True)
+
+# Bars per chunk for process_arrays
+CHUNK_BARS = 1 << 20
+
+# Column layout written by process_arrays
+OUTPUT_DTYPES = {
+    'EMA': np.float32,
+    'EMASignal': np.int8,
+    'isPivot': np.int8,
+    'pattern_detected': np.int8,
+    'signal': np.int8,
+}
+
+# Function to run the indicator pipeline over series too long to hold in memory
+def process_arrays(arrays, out_dir, ema_period, backcandles, window, pattern_backcandles, pattern_window,
+                   chunk_bars=CHUNK_BARS):
+    """
+    arrays: Open, High, Low and Close arrays, typically the memory maps from
+    OHLCVStore.read_arrays
+    Works through the series chunk by chunk, reading each chunk with enough
+    bars either side for its pivots and patterns, and carrying the EMA over
+    from the previous chunk, so the columns equal those of process_data while
+    memory use depends on chunk_bars rather than on the length of the series.
+    Returns: dict of read-only memory maps of the columns, saved as .npy files
+    in out_dir
+    """
+    n = len(arrays['Close'])
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {column: os.path.join(out_dir, f'{column}.npy') for column in OUTPUT_DTYPES}
+    outputs = {
+        column: np.lib.format.open_memmap(paths[column], mode='w+', dtype=dtype, shape=(n,))
+        for column, dtype in OUTPUT_DTYPES.items()
+    }
+    
+    # Bars before and after a chunk that its pivots and patterns look at
+    left = pattern_backcandles + pattern_window + window + 1
+    right = max(window, pattern_window + 1)
+    
+    # EMA state: the last defined value and the missing closes since, which
+    # is all pandas' ewm(adjust=False) carries from one bar to the next
+    ema_seed = np.empty(0)
+    ema_tail = np.empty(0)
+    for start in range(0, n, chunk_bars):
+        end = min(start + chunk_bars, n)
+        close = np.asarray(arrays['Close'][start:end], dtype=float)
+        ema = pd.Series(np.concatenate([ema_seed, close])).ewm(span=ema_period, adjust=False).mean()
+        ema = ema.to_numpy()[len(ema_seed):]
+        outputs['EMA'][start:end] = ema
+        
+        defined = np.flatnonzero(~np.isnan(close))
+        if len(defined):
+            ema_seed = np.concatenate([ema[defined[-1]:defined[-1] + 1], np.full(len(close) - 1 - defined[-1], np.nan)])
+        elif len(ema_seed):
+            ema_seed = np.concatenate([ema_seed, close])
+        
+        # The EMA signal looks back backcandles bars, at the full-precision EMA
+        lo = start - len(ema_tail)
+        ema = np.concatenate([ema_tail, ema])
+        columns = {'Open': arrays['Open'][lo:end], 'Close': arrays['Close'][lo:end], 'EMA': ema}
+        outputs['EMASignal'][start:end] = detect_ema_signals(columns, 'EMA', backcandles)[start - lo:]
+        ema_tail = ema[max(len(ema) - backcandles, 0):]
+        
+        # Pivots and patterns over the chunk plus its surrounding bars
+        lo, hi = max(start - left, 0), min(end + right, n)
+        high = np.asarray(arrays['High'][lo:hi], dtype=float)
+        low = np.asarray(arrays['Low'][lo:hi], dtype=float)
+        pivots = detect_pivots(high, low, window)
+        patterns = detect_patterns(arrays['Close'][lo:hi], high, low, pivots, pattern_backcandles, pattern_window)
+        inner = slice(start - lo, end - lo)
+        outputs['isPivot'][start:end] = pivots[inner]
+        outputs['pattern_detected'][start:end] = patterns[inner]
+        outputs['signal'][start:end] = combine_signals(pivots[inner], patterns[inner])
+    
+    for column in outputs:
+        outputs[column].flush()
+    del outputs
+    return {column: np.load(path, mmap_mode='r') for column, path in paths.items()}
+
+# Function to backtest the pipeline's signal with the backtest memoized too
+def backtest_log(df, window, pattern_backcandles, pattern_window,
+                 initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage,
+                 cache=DEFAULT_CACHE, profiler=None, intrabar=False, both_touched='stop'):
+    """
+    Only the signal parameters and the risk settings feed the backtest, so
+    EMA changes reuse the cached result
+    intrabar, both_touched: as for backtest_strategy
+    Returns: (columnar trade log, final balance) as from simulate_trades;
+    the log's arrays are read-only and shared with the cache
+    """
+    ctx = _context(df, cache, profiler)
+    signal = _signal(ctx, window, pattern_backcandles, pattern_window)
+    ranges = {}
+    if intrabar:
+        ranges = {'open_prices': df['Open'].to_numpy(), 'high': df['High'].to_numpy(), 'low': df['Low'].to_numpy()}
+    
+    def compute():
+        trades, balance = simulate_trades(
+            df['Close'].to_numpy(),
+            signal,
+            initial_balance,
+            risk_percentage,
+            stop_loss_percentage,
+            take_profit_percentage,
+            both_touched=both_touched,
+            **ranges
+        )
+        return {column: _frozen(array) for column, array in trades.items()}, balance
+    trades, balance = _cached(
+        ctx, 'backtest',
+        (window, pattern_backcandles, pattern_window,
+         initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage, intrabar, both_touched),
+        compute)
+    # A new dict each call, so a caller can replace a column without touching the cache
+    return dict(trades), balance
+
+# Function to run the memoized backtest and return the trade DataFrame
+def run_backtest(df, window, pattern_backcandles, pattern_window,
+                 initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage,
+                 cache=DEFAULT_CACHE, profiler=None, intrabar=False, both_touched='stop'):
+    """
+    Returns: (trades_df, final balance) as from backtest_strategy
+    """
+    trades, balance = backtest_log(df, window, pattern_backcandles, pattern_window,
+                                   initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage,
+                                   cache=cache, profiler=profiler, intrabar=intrabar, both_touched=both_touched)
+    return trades_to_frame(trades, df.index), balance
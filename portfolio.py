@@ -0,0 +1,154 @@
+import heapq
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from indicators import detect_pivots, detect_patterns, combine_signals
+from backtester import TRADE_COLUMNS, first_exit
+
+logger = logging.getLogger(__name__)
+
+# Function to load a symbol through the shared data handler
+def load_symbol(ticker, start_date, end_date, interval):
+    from data_handler import get_data
+    return get_data(ticker, start_date, end_date, interval)
+
+# Function to load a symbol from the local store only, once run_portfolio has fetched it
+def load_stored(ticker, start_date, end_date, interval):
+    from data_handler import get_stored
+    return get_stored(ticker, start_date, end_date, interval)
+
+# Function to turn one symbol's bars into the compact arrays the portfolio needs
+def symbol_signals(ticker, load, start_date, end_date, interval, window, pattern_backcandles, pattern_window):
+    """
+    Runs in a worker process; the DataFrame never leaves it
+    Returns: (ticker, dates as int64 nanoseconds, close, int8 signal), or
+    (ticker, None, None, None) if there is no data
+    """
+    df = load(ticker, start_date, end_date, interval)
+    if df is None or df.empty:
+        return ticker, None, None, None
+    close = df['Close'].to_numpy(dtype=float).reshape(-1)
+    pivots = detect_pivots(df['High'], df['Low'], window)
+    patterns = detect_patterns(close, df['High'], df['Low'], pivots, pattern_backcandles, pattern_window)
+    signal = combine_signals(pivots, patterns)
+    # asi8 is wall time for naive indexes and UTC for tz-aware ones
+    return ticker, df.index.asi8.copy(), close, signal
+
+# Function to simulate one shared account over many symbols
+def simulate_portfolio(symbols, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage,
+                       max_positions):
+    """
+    symbols: list of (ticker, dates, close, signal) as from symbol_signals
+    Signals from all symbols are merged on one timeline. Each entry is sized
+    from the current balance with the same risk rule as backtest_strategy, a
+    symbol holds at most one position, and entries are skipped while
+    max_positions are open. Exits on a bar are settled before that bar's
+    entries, and ties between symbols go to the order of `symbols`.
+    Returns: (trades DataFrame with a Ticker column, final balance)
+    """
+    # Every entry signal on the common timeline: (time, symbol, bar)
+    events = []
+    for s, (_, dates, _, signal) in enumerate(symbols):
+        bars = np.flatnonzero((signal == 1) | (signal == -1))
+        bars = bars[bars >= 1]
+        events.append(np.stack([dates[bars], np.full(len(bars), s), bars], axis=1))
+    events = np.concatenate(events) if events else np.empty((0, 3), dtype=np.int64)
+    events = events[np.lexsort((events[:, 1], events[:, 0]))]
+
+    balance = initial_balance
+    open_symbols = set()
+    exits = []  # heap of (exit time, symbol, entry bar, exit bar, direction, size)
+    trades = []
+
+    def settle(until):
+        nonlocal balance
+        while exits and exits[0][0] <= until:
+            _, s, i, j, position, position_size = heapq.heappop(exits)
+            ticker, dates, close, _ = symbols[s]
+            entry_price, exit_price = close[i], close[j]
+            if position == 1:
+                profit_loss = (exit_price - entry_price) / entry_price * 100
+                profit_loss_amount = (exit_price - entry_price) * position_size
+            else:
+                profit_loss = (entry_price - exit_price) / entry_price * 100
+                profit_loss_amount = (entry_price - exit_price) * position_size
+            balance += profit_loss_amount
+            open_symbols.discard(s)
+            trades.append((ticker, dates[i], dates[j], 'BUY' if position == 1 else 'SELL',
+                           entry_price, exit_price, profit_loss, profit_loss_amount, balance))
+
+    for time, s, i in events:
+        settle(time)
+        if s in open_symbols or len(open_symbols) >= max_positions:
+            continue
+
+        _, _, close, signal = symbols[s]
+        position = 1 if signal[i] == 1 else -1
+        entry_price = close[i]
+        risk_amount = balance * (risk_percentage / 100)
+        position_size = risk_amount / (entry_price * (stop_loss_percentage / 100))
+        if position == 1:
+            j = first_exit(close, i + 1, entry_price * (1 - stop_loss_percentage / 100),
+                           entry_price * (1 + take_profit_percentage / 100))
+        else:
+            j = first_exit(close, i + 1, entry_price * (1 - take_profit_percentage / 100),
+                           entry_price * (1 + stop_loss_percentage / 100))
+        # Positions still open at the end are closed on the symbol's last bar
+        if j < 0:
+            j = len(close) - 1
+        heapq.heappush(exits, (symbols[s][1][j], s, i, j, position, position_size))
+        open_symbols.add(s)
+
+    settle(np.iinfo(np.int64).max)
+
+    trades_df = pd.DataFrame(trades, columns=['Ticker'] + TRADE_COLUMNS)
+    for column in ['Entry Date', 'Exit Date']:
+        trades_df[column] = pd.to_datetime(trades_df[column].to_numpy(dtype=np.int64))
+    return trades_df, balance
+
+# Function to backtest a watchlist as one portfolio
+def run_portfolio(tickers, start_date, end_date, interval, window, pattern_backcandles, pattern_window,
+                  initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage,
+                  max_positions=5, max_workers=None, load=load_symbol):
+    """
+    Computes each symbol's signal in a worker process and keeps only its
+    dates, closes and int8 signal as results stream back, then simulates the
+    shared account with simulate_portfolio. load(ticker, start, end, interval)
+    must be a picklable callable returning an OHLCV DataFrame or None.
+    With the default load_symbol, every ticker is first downloaded in this
+    process with data_handler.get_many, under its one rate limit, and the
+    workers only read the local store; a custom load runs in the workers
+    and brings its own rate limit to each. max_workers=1 runs everything in
+    the calling process.
+    Returns: (trades DataFrame, final balance, list of tickers without data)
+    Dates are timezone-naive; symbols with tz-aware data are in UTC.
+    """
+    if load is load_symbol:
+        from data_handler import get_many
+        for ticker, _, error in get_many(tickers, start_date, end_date, interval):
+            if error is not None:
+                logger.error(error)
+        load = load_stored
+
+    args = (load, start_date, end_date, interval, window, pattern_backcandles, pattern_window)
+    results = {}
+    if max_workers == 1:
+        for ticker in tickers:
+            results[ticker] = symbol_signals(ticker, *args)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+            futures = [pool.submit(symbol_signals, ticker, *args) for ticker in tickers]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result[0]] = result
+
+    # Keep the caller's ticker order so tie-breaking is deterministic
+    symbols = [results[ticker] for ticker in tickers if results[ticker][1] is not None]
+    missing = [ticker for ticker in tickers if results[ticker][1] is None]
+    trades_df, balance = simulate_portfolio(
+        symbols, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage, max_positions)
+    return trades_df, balance, missing
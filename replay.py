@@ -0,0 +1,229 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from backtester import TRADE_COLUMNS
+from optimizer import SWEEP_PARAMETERS
+from streaming import SignalEngine
+
+# EMA settings for the shared signal engines; they only feed EMASignal, which
+# does not drive trades, so strategies are grouped without them
+REPLAY_EMA_PERIOD = 150
+REPLAY_BACKCANDLES = 15
+
+class ExecutorGroup:
+    """
+    The rules of streaming.TradeExecutor for many accounts that follow one
+    signal, with the state of every account held in arrays
+    Each bar costs a few NumPy operations for the whole group plus Python
+    work only for the accounts that actually fill, and the fills match
+    TradeExecutor's to the last bit.
+    """
+
+    def __init__(self):
+        self.names = []
+        self._settings = []
+        self.trades = []
+
+    def add(self, name, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage):
+        self.names.append(name)
+        self._settings.append((initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage))
+        self.trades.append([])
+
+    def start(self):
+        settings = np.array(self._settings, dtype=float).reshape(-1, 4)
+        self.balance = settings[:, 0].copy()
+        self.risk = settings[:, 1]
+        self.stop_loss_percentage = settings[:, 2]
+        self.take_profit_percentage = settings[:, 3]
+        size = len(self.names)
+        self.position = np.zeros(size, dtype=np.int8)
+        self.entry_price = np.zeros(size)
+        self.entry_date = [None] * size
+        self.stop_loss = np.zeros(size)
+        self.take_profit = np.zeros(size)
+        self.position_size = np.zeros(size)
+        self.trades = [[] for _ in self.names]
+        self._last_bar = None
+
+    def _close(self, accounts, date, exit_price, on_fill):
+        for k in accounts:
+            entry_price = self.entry_price[k]
+            if self.position[k] == 1:
+                profit_loss = (exit_price - entry_price) / entry_price * 100
+                profit_loss_amount = (exit_price - entry_price) * self.position_size[k]
+            else:
+                profit_loss = (entry_price - exit_price) / entry_price * 100
+                profit_loss_amount = (entry_price - exit_price) * self.position_size[k]
+            self.balance[k] += profit_loss_amount
+            trade = (self.entry_date[k], date, 'BUY' if self.position[k] == 1 else 'SELL', entry_price, exit_price,
+                     profit_loss, profit_loss_amount, self.balance[k])
+            self.trades[k].append(trade)
+            if on_fill is not None:
+                on_fill(self.names[k], 'Close', date, trade[2], exit_price, self.position_size[k], self.balance[k])
+        self.position[accounts] = 0
+
+    def on_bar(self, bar, on_fill=None):
+        self._last_bar = bar
+        # The batch backtest never trades on the first bar
+        if bar.position < 1:
+            return
+
+        price = bar.close
+        long = self.position == 1
+        short = self.position == -1
+        if long.any() or short.any():
+            exits = (long & ((price <= self.stop_loss) | (price >= self.take_profit))) | (
+                short & ((price >= self.stop_loss) | (price <= self.take_profit)))
+            if exits.any():
+                self._close(np.flatnonzero(exits), bar.date, price, on_fill)
+
+        if bar.signal == 1 or bar.signal == -1:
+            accounts = np.flatnonzero(self.position == 0)
+            if len(accounts) == 0:
+                return
+            risk_amount = self.balance[accounts] * (self.risk[accounts] / 100)
+            stop_loss_percentage = self.stop_loss_percentage[accounts]
+            take_profit_percentage = self.take_profit_percentage[accounts]
+            self.position[accounts] = bar.signal
+            self.entry_price[accounts] = price
+            if bar.signal == 1:
+                self.stop_loss[accounts] = price * (1 - stop_loss_percentage / 100)
+                self.take_profit[accounts] = price * (1 + take_profit_percentage / 100)
+            else:
+                self.stop_loss[accounts] = price * (1 + stop_loss_percentage / 100)
+                self.take_profit[accounts] = price * (1 - take_profit_percentage / 100)
+            self.position_size[accounts] = risk_amount / (price * (stop_loss_percentage / 100))
+            side = 'BUY' if bar.signal == 1 else 'SELL'
+            for k in accounts:
+                self.entry_date[k] = bar.date
+                if on_fill is not None:
+                    on_fill(self.names[k], 'Open', bar.date, side, price, self.position_size[k], self.balance[k])
+
+    def finish(self, on_fill=None):
+        # Close open positions on the last bar seen
+        if self._last_bar is not None:
+            open_accounts = np.flatnonzero(self.position != 0)
+            if len(open_accounts):
+                self._close(open_accounts, self._last_bar.date, self._last_bar.close, on_fill)
+
+class ReplayService:
+    """
+    Replays one historical OHLCV feed bar by bar to many strategy instances
+    The feed is decoded once. Instances that share the signal parameters
+    (window, pattern_backcandles, pattern_window) share one SignalEngine, and
+    each final bar fans out to their accounts through an ExecutorGroup, so
+    hundreds of instances cost little more per bar than a handful of signal
+    configurations. Every instance ends with the trades backtest_strategy
+    would produce for its parameters.
+    """
+
+    def __init__(self, df):
+        # Decode once into plain Python values shared by every instance
+        self.dates = list(df.index)
+        self._bars = list(zip(
+            self.dates,
+            df['Open'].to_numpy(dtype=float).reshape(-1).tolist(),
+            df['High'].to_numpy(dtype=float).reshape(-1).tolist(),
+            df['Low'].to_numpy(dtype=float).reshape(-1).tolist(),
+            df['Close'].to_numpy(dtype=float).reshape(-1).tolist(),
+        ))
+        stamps = df.index.asi8
+        self._seconds = ((stamps - stamps[0]) / 1e9).tolist() if len(stamps) else []
+        self._groups = {}
+        self._instances = {}
+
+    def add_strategy(self, name, window=SWEEP_PARAMETERS['window'],
+                     pattern_backcandles=SWEEP_PARAMETERS['pattern_backcandles'],
+                     pattern_window=SWEEP_PARAMETERS['pattern_window'], initial_balance=10000.0,
+                     risk_percentage=SWEEP_PARAMETERS['risk_percentage'],
+                     stop_loss_percentage=SWEEP_PARAMETERS['stop_loss_percentage'],
+                     take_profit_percentage=SWEEP_PARAMETERS['take_profit_percentage']):
+        if name in self._instances:
+            raise ValueError(f"Strategy {name!r} already added")
+        key = (window, pattern_backcandles, pattern_window)
+        group = self._groups.setdefault(key, ExecutorGroup())
+        group.add(name, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage)
+        self._instances[name] = (group, len(group.names) - 1, key + (
+            initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage))
+
+    async def run(self, speed=None, on_fill=None, yield_every=256):
+        """
+        speed: None to replay as fast as the CPU allows, otherwise the factor
+        by which the replay runs faster than the bars' own timestamps
+        on_fill(name, action, date, position, price, size, balance) is called
+        for every 'Open' and 'Close' fill
+        Other tasks on the event loop get a turn every yield_every bars, or
+        while waiting between bars when paced.
+        Returns: the per-instance report, as from report()
+        """
+        engines = []
+        for (window, pattern_backcandles, pattern_window), group in self._groups.items():
+            group.start()
+            engines.append((SignalEngine(REPLAY_EMA_PERIOD, REPLAY_BACKCANDLES, window, pattern_backcandles,
+                                         pattern_window), group))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for k, (date, open_price, high, low, close) in enumerate(self._bars):
+            if speed:
+                delay = started + self._seconds[k] / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif k % yield_every == 0:
+                await asyncio.sleep(0)
+
+            for engine, group in engines:
+                bar = engine.update(date, open_price, high, low, close)
+                if bar is not None:
+                    group.on_bar(bar, on_fill)
+
+        # End of history: release the bars still waiting for lookahead
+        for engine, group in engines:
+            for bar in engine.flush():
+                group.on_bar(bar, on_fill)
+            group.finish(on_fill)
+        return self.report()
+
+    def trades(self, name):
+        """
+        Returns: the instance's trades as a DataFrame like backtest_strategy's
+        """
+        group, k, _ = self._instances[name]
+        return pd.DataFrame(group.trades[k], columns=TRADE_COLUMNS)
+
+    def report(self):
+        """
+        Returns: DataFrame with one row per instance: its parameters, trades,
+        fills, win rate and balance
+        """
+        rows = []
+        for name, (group, k, params) in self._instances.items():
+            trades = group.trades[k]
+            initial_balance = params[3]
+            balance = float(group.balance[k]) if hasattr(group, 'balance') else initial_balance
+            wins = sum(1 for trade in trades if trade[6] > 0)
+            row = {'Strategy': name}
+            row.update(zip(['window', 'pattern_backcandles', 'pattern_window', 'initial_balance',
+                            'risk_percentage', 'stop_loss_percentage', 'take_profit_percentage'], params))
+            row.update({
+                'Trades': len(trades),
+                'Fills': 2 * len(trades),
+                'Win Rate (%)': wins / len(trades) * 100 if trades else 0.0,
+                'Final Balance': balance,
+                'Return (%)': (balance - initial_balance) / initial_balance * 100,
+            })
+            rows.append(row)
+        return pd.DataFrame(rows).set_index('Strategy') if rows else pd.DataFrame()
+
+# Function to replay a history to many strategies and wait for the result
+def replay(df, strategies, speed=None, on_fill=None):
+    """
+    strategies: dict of name -> keyword arguments for ReplayService.add_strategy
+    Returns: (report DataFrame, the ReplayService for per-instance trades)
+    """
+    service = ReplayService(df)
+    for name, params in strategies.items():
+        service.add_strategy(name, **params)
+    return asyncio.run(service.run(speed, on_fill)), service
@@ -0,0 +1,230 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import _to_ns
+
+# Intraday intervals by length in minutes, finest first
+INTRADAY_MINUTES = {'1m': 1, '5m': 5, '15m': 15, '1h': 60}
+
+# How far back Yahoo Finance serves each intraday interval, in days
+LOOKBACK_DAYS = {'1m': 30, '5m': 60, '15m': 60, '1h': 730}
+
+# Calendar intervals, all built from daily bars
+CALENDAR_INTERVALS = ('1d', '1wk', '1mo')
+
+_MINUTE = 60 * 10 ** 9
+_DAY = 24 * 60 * _MINUTE
+
+# Function to list the intervals a bar interval can be built from, finest first
+def base_candidates(interval):
+    if interval in CALENDAR_INTERVALS:
+        return ['1d']
+    if interval in INTRADAY_MINUTES:
+        return [base for base, minutes in INTRADAY_MINUTES.items() if INTRADAY_MINUTES[interval] % minutes == 0]
+    return [interval]
+
+# Function to group a sorted bar index into bars of a coarser interval
+def bucket_starts(index, interval):
+    """
+    Intraday bars are grouped in steps of the interval counted from each day's
+    first bar, so 1h bars of a session opening at 9:30 start at 9:30, 10:30,
+    ...; daily bars start at midnight, weekly ones on Monday and monthly ones
+    on the 1st, all in the index's own timezone
+    Returns: (position of each group's first bar, group start labels as
+    int64 nanoseconds, UTC for tz-aware indexes)
+    """
+    stamps = index.asi8
+    wall = index.tz_localize(None).asi8 if index.tz is not None else stamps
+    if len(wall) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    if interval in INTRADAY_MINUTES:
+        step = INTRADAY_MINUTES[interval] * _MINUTE
+        day = wall // _DAY
+        firsts = np.flatnonzero(np.diff(day, prepend=day[0] - 1))
+        day_open = np.repeat(wall[firsts], np.diff(np.append(firsts, len(wall))))
+        key = day_open + (wall - day_open) // step * step
+    elif interval == '1d':
+        key = wall // _DAY * _DAY
+    elif interval == '1wk':
+        # 1970-01-01 was a Thursday
+        day = wall // _DAY
+        key = (day - (day + 3) % 7) * _DAY
+    elif interval == '1mo':
+        key = wall.view('M8[ns]').astype('M8[M]').astype('M8[ns]').view(np.int64)
+    else:
+        raise ValueError(f"Cannot resample to {interval}")
+
+    starts = np.flatnonzero(np.diff(key, prepend=key[0] - 1))
+    # Shift each group's first timestamp back to the group start, which keeps
+    # labels right across timezone offsets
+    return starts, stamps[starts] - (wall[starts] - key[starts])
+
+# Function to aggregate bars between group starts
+def _aggregate(columns, starts):
+    """
+    columns: dict of equal-length arrays; Open takes the first value, High the
+    highest, Low the lowest, Volume the sum and anything else the last,
+    skipping missing values
+    Returns: dict of arrays with one value per group
+    """
+    n = len(next(iter(columns.values())))
+    positions = np.arange(n)
+    out = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if name == 'High':
+            out[name] = np.fmax.reduceat(values, starts)
+        elif name == 'Low':
+            out[name] = np.fmin.reduceat(values, starts)
+        elif name == 'Volume':
+            out[name] = np.add.reduceat(np.nan_to_num(values) if values.dtype.kind == 'f' else values, starts)
+        else:
+            valid = ~np.isnan(values) if values.dtype.kind == 'f' else np.ones(n, dtype=bool)
+            if name == 'Open':
+                picked = np.minimum.reduceat(np.where(valid, positions, n), starts)
+            else:
+                picked = np.maximum.reduceat(np.where(valid, positions, -1), starts)
+            ends = np.append(starts[1:], n)
+            found = (picked >= starts) & (picked < ends)
+            out[name] = np.where(found, values[np.clip(picked, 0, n - 1)], np.nan)
+    return out
+
+# Function to build a frame from group labels and aggregated columns
+def _frame(labels, columns, tz):
+    dates = pd.DatetimeIndex(labels.view('M8[ns]'), name='Date')
+    if tz is not None:
+        dates = dates.tz_localize('UTC').tz_convert(tz)
+    return pd.DataFrame(columns, index=dates, copy=False)
+
+# Function to resample OHLCV bars to a coarser interval
+def resample_ohlcv(data, interval):
+    """
+    Returns: OHLCV DataFrame of `interval` bars, each labelled with its start
+    """
+    starts, labels = bucket_starts(data.index, interval)
+    if len(starts) == 0:
+        return data.iloc[:0]
+    columns = _aggregate({column: data[column].to_numpy() for column in data.columns}, starts)
+    return _frame(labels, columns, data.index.tz)
+
+# One resampled series: the groups over the whole stored base series and how
+# much of that series was final when they were built
+_Resampled = namedtuple('_Resampled', 'first_ns stable_pos stable_last_ns starts labels columns')
+
+class ResampleCache:
+    """
+    Serves every interval from one stored base resolution per ticker
+    Each request is answered from the finest base interval that divides it and
+    that is either already stored for the range or still within Yahoo
+    Finance's lookback, so a ticker is downloaded once and switching intervals
+    only resamples locally. Resampled series are kept per (ticker, base,
+    interval) and extended incrementally: bars before the store's covered end
+    are final, so only groups from the first bar after it are rebuilt when new
+    base bars arrive.
+    store: a data_store.OHLCVStore
+    """
+
+    def __init__(self, store, max_entries=32):
+        self.store = store
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def base_interval(self, ticker, interval, start):
+        """
+        Returns: the interval to download and store for this request
+        Raises ValueError if no base interval can still be downloaded that far back
+        """
+        start = pd.Timestamp(start)
+        age = (pd.Timestamp.now().normalize() - start).days
+        candidates = base_candidates(interval)
+        for base in candidates:
+            coverage = self.store.coverage(ticker, base)
+            if (coverage is not None and coverage[0] <= start) or age < LOOKBACK_DAYS.get(base, np.inf):
+                return base
+        raise ValueError(f"{interval} bars are only available for the last {LOOKBACK_DAYS[candidates[-1]]} days.")
+
+    def _update(self, key, meta, arrays):
+        index = arrays['index']
+        columns = meta['columns']
+        stable_pos = int(np.searchsorted(index, _to_ns(meta['end'], meta['tz']), side='left'))
+        with self._lock:
+            entry = self._entries.get(key)
+
+        # Rebuild from the group holding the first bar that was not final
+        rebuild = 0
+        if (entry is not None and len(index) and entry.first_ns == index[0] and entry.stable_pos <= len(index)
+                and (entry.stable_pos == 0 or index[entry.stable_pos - 1] == entry.stable_last_ns)):
+            if entry.stable_pos == stable_pos == len(index):
+                return entry
+            group = int(np.searchsorted(entry.starts, entry.stable_pos, side='right')) - 1
+            # Intraday groups are anchored on the day's first bar, so restart there
+            stamp = pd.Timestamp(int(index[entry.starts[group]]))
+            if meta['tz'] is not None:
+                stamp = stamp.tz_localize('UTC').tz_convert(meta['tz'])
+            day_start = int(np.searchsorted(index, _to_ns(stamp.normalize(), meta['tz']), side='left'))
+            rebuild = int(np.searchsorted(entry.starts, day_start, side='left'))
+
+        if rebuild > 0:
+            position = entry.starts[rebuild]
+            dates = pd.DatetimeIndex(np.asarray(index[position:]).view('M8[ns]'))
+            if meta['tz'] is not None:
+                dates = dates.tz_localize('UTC').tz_convert(meta['tz'])
+            starts, labels = bucket_starts(dates, key[2])
+            tail = _aggregate({column: arrays[column][position:] for column in columns}, starts)
+            starts = np.concatenate([entry.starts[:rebuild], starts + position])
+            labels = np.concatenate([entry.labels[:rebuild], labels])
+            aggregated = {column: np.concatenate([entry.columns[column][:rebuild], tail[column]])
+                          for column in columns}
+        else:
+            dates = pd.DatetimeIndex(np.asarray(index).view('M8[ns]'))
+            if meta['tz'] is not None:
+                dates = dates.tz_localize('UTC').tz_convert(meta['tz'])
+            starts, labels = bucket_starts(dates, key[2])
+            aggregated = _aggregate({column: arrays[column] for column in columns}, starts) if len(starts) else {}
+
+        entry = _Resampled(int(index[0]) if len(index) else 0, stable_pos,
+                           int(index[stable_pos - 1]) if stable_pos else 0, starts, labels, aggregated)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get(self, ticker, start, end, interval):
+        """
+        Bars for [start, end), built from the base bars in that range; a
+        period cut by start or end is aggregated from the bars inside it
+        Returns: DataFrame, or None if there is no data
+        """
+        base = self.base_interval(ticker, interval, start)
+        if base == interval:
+            return self.store.get(ticker, start, end, interval)
+
+        # Download whatever the base series is missing, then resample locally
+        if self.store.get(ticker, start, end, base) is None:
+            return None
+        meta, arrays = self.store.read_arrays(ticker, base)
+        entry = self._update((ticker, base, interval), meta, arrays)
+
+        index = arrays['index']
+        lo = int(np.searchsorted(index, _to_ns(start, meta['tz']), side='left'))
+        hi = int(np.searchsorted(index, _to_ns(end, meta['tz']), side='left'))
+        first = int(np.searchsorted(entry.starts, lo, side='right')) - 1
+        last = int(np.searchsorted(entry.starts, hi, side='left'))
+        columns = {column: entry.columns[column][first:last].copy() for column in meta['columns']}
+
+        # The first and last groups may reach outside the range
+        for group in {first, last - 1}:
+            group_start = max(entry.starts[group], lo)
+            group_end = min(entry.starts[group + 1] if group + 1 < len(entry.starts) else len(index), hi)
+            part = _aggregate({column: arrays[column][group_start:group_end] for column in meta['columns']},
+                              np.zeros(1, dtype=np.int64))
+            for column in columns:
+                columns[column][group - first] = part[column][0]
+        return _frame(entry.labels[first:last], columns, meta['tz'])
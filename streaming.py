@@ -0,0 +1,310 @@
+from collections import deque, namedtuple
+
+# A bar whose signal is final: position is its 0-based bar number in the feed
+SignalBar = namedtuple('SignalBar', 'position date close ema ema_signal pivot pattern signal')
+
+class SignalEngine:
+    """
+    Bar-by-bar version of the indicator pipeline in app.process_data
+    EMA and EMASignal are known as soon as a bar arrives, but a pivot is only
+    confirmed `window` bars later and a pattern needs pattern_window + 1 bars
+    after the candle, exactly like the batch functions. update() therefore
+    returns each bar once its signal can no longer change, lagging the feed
+    by `lag` bars; flush() releases the remaining bars at the end of history.
+    Work and memory per bar do not grow with the length of the history.
+    """
+
+    def __init__(self, ema_period, backcandles, window, pattern_backcandles, pattern_window, zone_width=0.001):
+        self.backcandles = backcandles
+        self.window = window
+        self.pattern_backcandles = pattern_backcandles
+        self.pattern_window = pattern_window
+        self.zone_width = zone_width
+        self.lag = max(window, pattern_window + 1)
+        self.count = 0
+
+        # EMA state, following pandas' ewm(span=ema_period, adjust=False)
+        self._alpha = 1.0 / (1.0 + (ema_period - 1) / 2.0)
+        self._ema = None
+        self._old_weight = 1.0
+
+        # Candles breaking the EMA trend over the last backcandles + 1 bars
+        self._trend_breaks = deque()
+        self._breaks_down = 0
+        self._breaks_up = 0
+
+        # Monotonic deques of (position, value) for the pivot neighbourhood
+        self._highs = deque(maxlen=2 * window + 1)
+        self._lows = deque(maxlen=2 * window + 1)
+        self._max_high = deque()
+        self._min_low = deque()
+
+        # Confirmed pivots waiting to enter a pattern lookback, and the last
+        # three that already have
+        self._new_pivot_highs = deque()
+        self._new_pivot_lows = deque()
+        self._pivot_highs = deque(maxlen=3)
+        self._pivot_lows = deque(maxlen=3)
+
+        # Bars not yet final: [date, close, ema, ema_signal, pivot]
+        self._pending = deque()
+
+    def _update_ema(self, close):
+        if self._ema is None:
+            self._ema = close
+        elif self._ema == self._ema:
+            if close == close:
+                self._old_weight *= 1.0 - self._alpha
+                if self._ema != close:
+                    self._ema = (self._old_weight * self._ema + self._alpha * close) / (self._old_weight + self._alpha)
+                self._old_weight = 1.0
+            else:
+                self._old_weight *= 1.0 - self._alpha
+        elif close == close:
+            self._ema = close
+        return self._ema
+
+    def _ema_signal(self, open_price, close, ema):
+        # Same order-dependent max/min as the batch version, so a NaN close
+        # leaves the open as the body and a NaN open never counts
+        breaks_down = max(open_price, close) >= ema
+        breaks_up = min(open_price, close) <= ema
+        self._trend_breaks.append((breaks_down, breaks_up))
+        self._breaks_down += breaks_down
+        self._breaks_up += breaks_up
+        if len(self._trend_breaks) > self.backcandles + 1:
+            old_down, old_up = self._trend_breaks.popleft()
+            self._breaks_down -= old_down
+            self._breaks_up -= old_up
+        if self.count < self.backcandles:
+            return 0
+
+        dnt = self._breaks_down == 0
+        upt = self._breaks_up == 0
+        if upt and dnt:
+            return 3
+        if upt:
+            return 2
+        if dnt:
+            return 1
+        return 0
+
+    def _push_extremes(self, position, high, low):
+        self._highs.append(high)
+        self._lows.append(low)
+        # NaNs are left out, so they never disqualify a pivot
+        if high == high:
+            while self._max_high and self._max_high[-1][1] <= high:
+                self._max_high.pop()
+            self._max_high.append((position, high))
+        if low == low:
+            while self._min_low and self._min_low[-1][1] >= low:
+                self._min_low.pop()
+            self._min_low.append((position, low))
+        oldest = position - 2 * self.window
+        while self._max_high and self._max_high[0][0] < oldest:
+            self._max_high.popleft()
+        while self._min_low and self._min_low[0][0] < oldest:
+            self._min_low.popleft()
+
+    def _confirm_pivot(self, position):
+        # The candle `window` bars back now has its full neighbourhood
+        center = position - self.window
+        if center < self.window:
+            return
+        high = self._highs[self.window]
+        low = self._lows[self.window]
+        window_high = self._max_high[0][1] if self._max_high else float('-inf')
+        window_low = self._min_low[0][1] if self._min_low else float('inf')
+        pivot = (not high < window_high) * 1 + (not low > window_low) * 2
+        self._pending[-(self.window + 1)][4] = pivot
+        if pivot == 1:
+            self._new_pivot_highs.append((center, high))
+        elif pivot == 2:
+            self._new_pivot_lows.append((center, low))
+
+    def _zone(self, new_pivots, pivots, candle):
+        # Move pivots that fall before this candle's lookback end into the last three
+        while new_pivots and new_pivots[0][0] < candle - self.pattern_window:
+            pivots.append(new_pivots.popleft())
+        if len(pivots) < 3 or pivots[0][0] < candle - self.pattern_backcandles - self.pattern_window:
+            return None
+        first, second, third = pivots[0][1], pivots[1][1], pivots[2][1]
+        mean = (first + second + third) / 3
+        if abs(first - mean) <= self.zone_width and abs(second - mean) <= self.zone_width and abs(third - mean) <= self.zone_width:
+            return mean
+        return None
+
+    def _finalize(self):
+        candle = self.count - len(self._pending)
+        date, close, ema, ema_signal, pivot = self._pending.popleft()
+
+        pattern = 0
+        if candle > self.pattern_backcandles + self.pattern_window and candle + self.pattern_window + 1 < self.count:
+            support = self._zone(self._new_pivot_lows, self._pivot_lows, candle)
+            resistance = self._zone(self._new_pivot_highs, self._pivot_highs, candle)
+            if support is not None and (support - close) > self.zone_width * 2:
+                pattern = 1
+            elif resistance is not None and (close - resistance) > self.zone_width * 2:
+                pattern = 2
+
+        if pivot == 2 or pattern == 2:
+            signal = 1
+        elif pivot == 1 or pattern == 1:
+            signal = -1
+        else:
+            signal = 0
+        return SignalBar(candle, date, close, ema, ema_signal, pivot, pattern, signal)
+
+    def update(self, date, open_price, high, low, close):
+        """
+        Feed the next bar
+        Returns: the SignalBar that became final, or None while filling up
+        """
+        ema = self._update_ema(close)
+        ema_signal = self._ema_signal(open_price, close, ema)
+        self._pending.append([date, close, ema, ema_signal, 0])
+        self._push_extremes(self.count, high, low)
+        self._confirm_pivot(self.count)
+        self.count += 1
+        if len(self._pending) > self.lag:
+            return self._finalize()
+        return None
+
+    def flush(self):
+        """
+        End of history: release the bars still waiting for lookahead, with the
+        same edge handling as the batch functions
+        Returns: list of SignalBar
+        """
+        bars = []
+        while self._pending:
+            bars.append(self._finalize())
+        return bars
+
+class TradeExecutor:
+    """
+    Bar-by-bar version of the entry and exit rules in backtest_strategy
+    """
+
+    def __init__(self, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage):
+        self.balance = initial_balance
+        self.risk_percentage = risk_percentage
+        self.stop_loss_percentage = stop_loss_percentage
+        self.take_profit_percentage = take_profit_percentage
+        self.trades = []
+        self.position = 0  # 0: no position, 1: long, -1: short
+        self.entry_price = 0
+        self.entry_date = None
+        self.stop_loss = 0
+        self.take_profit = 0
+        self.position_size = 0
+        self._last_bar = None
+
+    def _close(self, date, exit_price):
+        if self.position == 1:
+            profit_loss = (exit_price - self.entry_price) / self.entry_price * 100
+            profit_loss_amount = (exit_price - self.entry_price) * self.position_size
+        else:
+            profit_loss = (self.entry_price - exit_price) / self.entry_price * 100
+            profit_loss_amount = (self.entry_price - exit_price) * self.position_size
+        self.balance += profit_loss_amount
+
+        trade = {
+            'Entry Date': self.entry_date,
+            'Exit Date': date,
+            'Position': 'BUY' if self.position == 1 else 'SELL',
+            'Entry Price': self.entry_price,
+            'Exit Price': exit_price,
+            'Profit/Loss Percentage': profit_loss,
+            'Profit/Loss Amount': profit_loss_amount,
+            'Balance': self.balance
+        }
+        self.trades.append(trade)
+        self.position = 0
+        return trade
+
+    def on_bar(self, bar):
+        """
+        Apply the trading rules to a final bar
+        Returns: the trade closed on this bar, or None
+        """
+        self._last_bar = bar
+        # The batch backtest never trades on the first bar
+        if bar.position < 1:
+            return None
+
+        trade = None
+        price = bar.close
+        if self.position == 1 and (price <= self.stop_loss or price >= self.take_profit):
+            trade = self._close(bar.date, price)
+        elif self.position == -1 and (price >= self.stop_loss or price <= self.take_profit):
+            trade = self._close(bar.date, price)
+
+        if self.position == 0 and (bar.signal == 1 or bar.signal == -1):
+            risk_amount = self.balance * (self.risk_percentage / 100)
+            self.position = bar.signal
+            self.entry_price = price
+            self.entry_date = bar.date
+            if bar.signal == 1:
+                self.stop_loss = price * (1 - self.stop_loss_percentage / 100)
+                self.take_profit = price * (1 + self.take_profit_percentage / 100)
+            else:
+                self.stop_loss = price * (1 + self.stop_loss_percentage / 100)
+                self.take_profit = price * (1 - self.take_profit_percentage / 100)
+            self.position_size = risk_amount / (price * (self.stop_loss_percentage / 100))
+        return trade
+
+    def finish(self):
+        """
+        Close any open position on the last bar seen
+        Returns: the closing trade, or None
+        """
+        if self.position != 0:
+            return self._close(self._last_bar.date, self._last_bar.close)
+        return None
+
+class StrategyEngine:
+    """
+    Stateful strategy for paper trading: feed bars one at a time with update()
+    and call finish() at the end of a replay. Replaying a history reproduces
+    the batch signal column and the trades of backtest_strategy, with the
+    signal for each bar arriving `lag` bars later because pivots and patterns
+    look ahead.
+    """
+
+    def __init__(self, ema_period, backcandles, window, pattern_backcandles, pattern_window,
+                 initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage):
+        self.signals = SignalEngine(ema_period, backcandles, window, pattern_backcandles, pattern_window)
+        self.executor = TradeExecutor(initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage)
+
+    @property
+    def lag(self):
+        return self.signals.lag
+
+    @property
+    def balance(self):
+        return self.executor.balance
+
+    @property
+    def trades(self):
+        return self.executor.trades
+
+    def update(self, date, open_price, high, low, close):
+        """
+        Returns: the SignalBar that became final on this update, or None
+        """
+        bar = self.signals.update(date, open_price, high, low, close)
+        if bar is not None:
+            self.executor.on_bar(bar)
+        return bar
+
+    def finish(self):
+        """
+        Returns: the SignalBars released at the end of history
+        """
+        bars = self.signals.flush()
+        for bar in bars:
+            self.executor.on_bar(bar)
+        self.executor.finish()
+        return bars
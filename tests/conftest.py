@@ -0,0 +1,57 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import synthetic_ohlcv
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+# Function to build a seeded OHLCV frame for tests
+def make_ohlcv(n=2000, seed=0, nan_rate=0.0, missing_rate=0.0, tick=None, **kwargs):
+    """
+    benchmark.synthetic_ohlcv (minute bars) with optional damage
+    nan_rate: chance of each price being missing on its own
+    missing_rate: chance of a whole bar's prices being missing
+    tick: round prices to this step, which makes ties and tight zones common
+    """
+    df = synthetic_ohlcv(n, seed=seed, **kwargs)
+    if tick is not None:
+        df[PRICE_COLUMNS] = np.round(df[PRICE_COLUMNS].to_numpy() / tick) * tick
+    rng = np.random.default_rng(seed + 1)
+    for column in PRICE_COLUMNS:
+        df.loc[rng.random(n) < nan_rate, column] = np.nan
+    df.loc[rng.random(n) < missing_rate, PRICE_COLUMNS] = np.nan
+    return df
+
+@pytest.fixture
+def ohlcv():
+    return make_ohlcv
+
+class FakeDownloader:
+    """
+    Serves slices of fixed per-ticker histories and records every request
+    """
+
+    def __init__(self, histories):
+        self.histories = histories
+        self.calls = []
+
+    def __call__(self, ticker, start, end, interval):
+        self.calls.append((ticker, pd.Timestamp(start), pd.Timestamp(end)))
+        df = self.histories.get(ticker)
+        if df is None:
+            return None
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if df.index.tz is not None:
+            start, end = start.tz_localize(df.index.tz), end.tz_localize(df.index.tz)
+        return df[(df.index >= start) & (df.index < end)]
+
+@pytest.fixture
+def fake_downloader():
+    return FakeDownloader
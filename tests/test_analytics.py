@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import pipeline
+from analytics import equity_curve, performance_metrics
+from backtester import simulate_trades
+
+# Per-bar reference: realized P/L up to each bar plus every open position
+# at the latest close seen so far
+def _equity_loop(close, trades, initial_balance):
+    equity = np.empty(len(close))
+    mark = np.nan
+    for t in range(len(close)):
+        if not np.isnan(close[t]):
+            mark = close[t]
+        value = initial_balance
+        for k in range(len(trades['entry_bar'])):
+            if trades['exit_bar'][k] <= t:
+                value += trades['profit_loss_amount'][k]
+            elif trades['entry_bar'][k] <= t:
+                value += trades['direction'][k] * trades['size'][k] * (mark - trades['entry_price'][k])
+        equity[t] = value
+    return equity
+
+def _trades(ohlcv, seed, intrabar):
+    df = ohlcv(1500, seed=seed, tick=0.0005, missing_rate=0.01)
+    signal = pipeline.process_data(df, 20, 5, 5, 30, 5, cache=pipeline.StageCache())['signal']
+    ranges = {}
+    if intrabar:
+        ranges = {'open_prices': df['Open'], 'high': df['High'], 'low': df['Low']}
+    trades, balance = simulate_trades(df['Close'], signal, 10000.0, 2.0, 0.3, 0.5, **ranges)
+    return df['Close'].to_numpy(), trades, balance
+
+@pytest.mark.parametrize('intrabar', [False, True])
+@pytest.mark.parametrize('seed', range(5))
+def test_equity_curve_matches_mark_to_market(ohlcv, seed, intrabar):
+    close, trades, balance = _trades(ohlcv, seed, intrabar)
+    assert len(trades['entry_bar']) > 1
+    equity = equity_curve(close, trades, 10000.0)
+    assert np.isnan(close).any() and not np.isnan(equity).any()
+    np.testing.assert_allclose(equity, _equity_loop(close, trades, 10000.0), rtol=1e-12)
+    assert equity[-1] == pytest.approx(balance, rel=1e-12)
+
+def test_equity_curve_sums_overlapping_positions():
+    close = np.array([100.0, 101.0, 103.0, 102.0, 99.0, 98.0, 100.0])
+    trades = {
+        'entry_bar': np.array([1, 2, 2]),
+        'exit_bar': np.array([4, 3, 6]),
+        'direction': np.array([1, -1, 1], dtype=np.int8),
+        'size': np.array([10.0, 4.0, 2.5]),
+        'entry_price': np.array([101.0, 103.0, 103.0]),
+        'profit_loss_amount': np.array([-20.0, 4.0, -7.5]),
+    }
+    np.testing.assert_allclose(equity_curve(close, trades, 1000.0), _equity_loop(close, trades, 1000.0))
+
+def test_performance_metrics_match_per_bar_definitions(ohlcv):
+    close, trades, _ = _trades(ohlcv, 0, False)
+    equity = equity_curve(close, trades, 10000.0)
+    metrics = performance_metrics(equity, trades, periods_per_year=252)
+
+    peak, drawdown = equity[0], 0.0
+    for value in equity:
+        peak = max(peak, value)
+        drawdown = max(drawdown, (peak - value) / peak * 100)
+    assert metrics['Max Drawdown'] == pytest.approx(drawdown)
+
+    in_market = [any(i <= t < j for i, j in zip(trades['entry_bar'], trades['exit_bar']))
+                 for t in range(len(equity))]
+    assert metrics['Exposure'] == pytest.approx(np.mean(in_market) * 100)
+    assert metrics['Return'] == pytest.approx((equity[-1] / equity[0] - 1) * 100)
+    assert metrics['Average Duration (bars)'] == pytest.approx(np.mean(trades['exit_bar'] - trades['entry_bar']))
+
+def test_performance_metrics_of_a_flat_curve():
+    trades = {'entry_bar': np.empty(0, dtype=np.int64), 'exit_bar': np.empty(0, dtype=np.int64)}
+    metrics = performance_metrics(np.full(10, 500.0), trades)
+    assert metrics['Return'] == metrics['Max Drawdown'] == metrics['Sharpe'] == metrics['Exposure'] == 0.0
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import TRADE_COLUMNS, backtest_strategy, first_touch, intrabar_exit_price, simulate_trades
+
+# Reference: the original per-bar loop
+def _backtest_loop(df, initial_balance, risk_percentage, stop_loss_percentage, take_profit_percentage):
+    balance = initial_balance
+    position = 0
+    entry_price = 0
+    entry_date = None
+    stop_loss = 0
+    take_profit = 0
+    trades = []
+    position_size = 0
+
+    def record(exit_date, exit_price):
+        nonlocal balance
+        if position == 1:
+            profit_loss = (exit_price - entry_price) / entry_price * 100
+            profit_loss_amount = (exit_price - entry_price) * position_size
+        else:
+            profit_loss = (entry_price - exit_price) / entry_price * 100
+            profit_loss_amount = (entry_price - exit_price) * position_size
+        balance += profit_loss_amount
+        trades.append({
+            'Entry Date': entry_date,
+            'Exit Date': exit_date,
+            'Position': 'BUY' if position == 1 else 'SELL',
+            'Entry Price': entry_price,
+            'Exit Price': exit_price,
+            'Profit/Loss Percentage': profit_loss,
+            'Profit/Loss Amount': profit_loss_amount,
+            'Balance': balance
+        })
+
+    for i in range(1, len(df)):
+        current_date = df.index[i]
+        current_price = df['Close'].values[i]
+        signal = df['signal'].values[i]
+        if position == 1 and (current_price <= stop_loss or current_price >= take_profit):
+            record(current_date, current_price)
+            position = 0
+        elif position == -1 and (current_price >= stop_loss or current_price <= take_profit):
+            record(current_date, current_price)
+            position = 0
+
+        if position == 0 and signal != 0:
+            risk_amount = balance * (risk_percentage / 100)
+            if signal == 1:
+                position = 1
+                entry_price = current_price
+                entry_date = current_date
+                stop_loss = entry_price * (1 - stop_loss_percentage / 100)
+                take_profit = entry_price * (1 + take_profit_percentage / 100)
+                position_size = risk_amount / (entry_price * (stop_loss_percentage / 100))
+            elif signal == -1:
+                position = -1
+                entry_price = current_price
+                entry_date = current_date
+                stop_loss = entry_price * (1 + stop_loss_percentage / 100)
+                take_profit = entry_price * (1 - take_profit_percentage / 100)
+                position_size = risk_amount / (entry_price * (stop_loss_percentage / 100))
+
+    if position != 0:
+        record(df.index[-1], df['Close'].values[-1])
+    return pd.DataFrame(trades), balance
+
+def _signal_frame(ohlcv, seed, n, nan_rate=0.0):
+    rng = np.random.default_rng(seed)
+    df = ohlcv(n, seed=seed, nan_rate=nan_rate)
+    # Mostly flat, with entries of both sides and stray values the backtest ignores
+    df['signal'] = rng.choice([0, 1, -1, 2, 3], size=n, p=[0.85, 0.06, 0.06, 0.02, 0.01]).astype(np.int8)
+    return df
+
+@pytest.mark.parametrize('seed', range(60))
+def test_backtest_strategy_matches_loop(ohlcv, seed):
+    rng = np.random.default_rng(seed)
+    df = _signal_frame(ohlcv, seed, int(rng.integers(1, 400)), 0.0 if seed < 40 else 0.02)
+    params = (10000.0, float(rng.uniform(0.5, 5)), float(rng.uniform(0.05, 0.5)), float(rng.uniform(0.05, 1)))
+    expected, expected_balance = _backtest_loop(df, *params)
+    trades, balance = backtest_strategy(df, *params)
+
+    assert list(trades.columns) == TRADE_COLUMNS
+    assert len(trades) == len(expected)
+    if len(expected):
+        pd.testing.assert_frame_equal(trades, expected[TRADE_COLUMNS], check_dtype=False)
+    np.testing.assert_equal(balance, expected_balance)
+
+def test_backtest_strategy_without_trades_has_trade_columns(ohlcv):
+    df = _signal_frame(ohlcv, 0, 50)
+    for df in [df.iloc[:0], df.assign(signal=0)]:
+        trades, balance = backtest_strategy(df, 10000.0, 2.0, 2.5, 5.0)
+        assert trades.empty
+        assert list(trades.columns) == TRADE_COLUMNS
+        assert balance == 10000.0
+
+# Reference: the per-bar loop checking each bar's range against the levels
+def _intrabar_loop(open_prices, high, low, close, signal, balance, risk_percentage, stop_loss_percentage,
+                   take_profit_percentage, both_touched):
+    position = 0
+    trades = []
+    for i in range(1, len(close)):
+        if position != 0:
+            if position == 1:
+                gapped = open_prices[i] <= stop_loss or open_prices[i] >= take_profit
+                stop_hit, target_hit = low[i] <= stop_loss, high[i] >= take_profit
+            else:
+                gapped = open_prices[i] >= stop_loss or open_prices[i] <= take_profit
+                stop_hit, target_hit = high[i] >= stop_loss, low[i] <= take_profit
+            if gapped or stop_hit or target_hit:
+                if gapped:
+                    exit_price = open_prices[i]
+                elif stop_hit and target_hit:
+                    exit_price = stop_loss if both_touched == 'stop' else take_profit
+                else:
+                    exit_price = stop_loss if stop_hit else take_profit
+                balance += (exit_price - entry_price) * position * position_size
+                trades.append((entry_bar, i, exit_price, balance))
+                position = 0
+        if position == 0 and signal[i] in (1, -1):
+            position = int(signal[i])
+            entry_price = close[i]
+            entry_bar = i
+            position_size = balance * (risk_percentage / 100) / (entry_price * (stop_loss_percentage / 100))
+            if position == 1:
+                stop_loss = entry_price * (1 - stop_loss_percentage / 100)
+                take_profit = entry_price * (1 + take_profit_percentage / 100)
+            else:
+                stop_loss = entry_price * (1 + stop_loss_percentage / 100)
+                take_profit = entry_price * (1 - take_profit_percentage / 100)
+    if position != 0:
+        balance += (close[-1] - entry_price) * position * position_size
+        trades.append((entry_bar, len(close) - 1, close[-1], balance))
+    return trades, balance
+
+@pytest.mark.parametrize('both_touched', ['stop', 'target'])
+@pytest.mark.parametrize('seed', range(15))
+def test_intrabar_exits_match_per_bar_loop(ohlcv, seed, both_touched):
+    rng = np.random.default_rng(seed)
+    df = _signal_frame(ohlcv, seed, 1500)
+    # Gap some opens away from the previous close, widening the bar to cover
+    # them, and give some bars long wicks that reach both levels
+    gaps = rng.random(len(df)) < 0.05
+    df.loc[gaps, 'Open'] *= 1 + rng.normal(0, 0.004, gaps.sum())
+    spikes = rng.random(len(df)) < 0.1
+    df.loc[spikes, 'High'] *= 1.004
+    df.loc[spikes, 'Low'] *= 0.996
+    df['High'] = df[['High', 'Open']].max(axis=1)
+    df['Low'] = df[['Low', 'Open']].min(axis=1)
+    params = (10000.0, 2.0, float(rng.uniform(0.05, 0.3)), float(rng.uniform(0.05, 0.6)))
+
+    columns = [df[column].to_numpy() for column in ['Open', 'High', 'Low', 'Close']]
+    expected, expected_balance = _intrabar_loop(*columns, df['signal'].to_numpy(), *params, both_touched)
+    trades, balance = backtest_strategy(df, *params, intrabar=True, both_touched=both_touched)
+
+    entry_bar = df.index.get_indexer(trades['Entry Date'])
+    exit_bar = df.index.get_indexer(trades['Exit Date'])
+    got = list(zip(entry_bar, exit_bar, trades['Exit Price'], trades['Balance']))
+    assert len(expected) > 10
+    assert got == pytest.approx(expected, rel=1e-12)
+    assert balance == pytest.approx(expected_balance, rel=1e-12)
+
+@pytest.mark.parametrize('position, stop_loss, take_profit, bar, both_touched, expected', [
+    # Long: stop, target, both, gaps through either level
+    (1, 99.0, 102.0, (100.0, 98.5, 101.0), 'stop', 99.0),
+    (1, 99.0, 102.0, (100.0, 99.5, 102.5), 'stop', 102.0),
+    (1, 99.0, 102.0, (100.0, 98.0, 103.0), 'stop', 99.0),
+    (1, 99.0, 102.0, (100.0, 98.0, 103.0), 'target', 102.0),
+    (1, 99.0, 102.0, (98.0, 97.0, 101.0), 'target', 98.0),
+    (1, 99.0, 102.0, (103.0, 101.0, 104.0), 'stop', 103.0),
+    # Short: the same with the levels flipped
+    (-1, 101.0, 98.0, (100.0, 99.0, 101.5), 'target', 101.0),
+    (-1, 101.0, 98.0, (100.0, 97.5, 100.5), 'stop', 98.0),
+    (-1, 101.0, 98.0, (100.0, 97.0, 102.0), 'stop', 101.0),
+    (-1, 101.0, 98.0, (100.0, 97.0, 102.0), 'target', 98.0),
+    (-1, 101.0, 98.0, (102.0, 99.0, 103.0), 'target', 102.0),
+    (-1, 101.0, 98.0, (97.0, 96.0, 99.0), 'stop', 97.0),
+])
+def test_intrabar_exit_price(position, stop_loss, take_profit, bar, both_touched, expected):
+    open_price, low, high = bar
+    assert intrabar_exit_price(open_price, low, high, position, stop_loss, take_profit, both_touched) == expected
+
+def test_first_touch_across_chunks():
+    low = np.full(1000, 10.0)
+    high = np.full(1000, 11.0)
+    assert first_touch(low, high, 0, 9.0, 12.0) == -1
+    for bar in [0, 63, 64, 191, 192, 999]:
+        touched = low.copy()
+        touched[bar] = 9.0
+        assert first_touch(touched, high, 0, 9.0, 12.0) == bar
+        assert first_touch(touched, high, bar + 1, 9.0, 12.0) == -1
+
+def test_unknown_both_touched_rule_is_rejected():
+    with pytest.raises(ValueError):
+        simulate_trades([1.0, 2.0], [0, 1], 10000.0, 2.0, 2.5, 5.0, both_touched='first')
@@ -0,0 +1,14 @@
+import pytest
+
+import cli
+
+def test_parquet_without_an_engine_fails_before_any_work(monkeypatch, capsys):
+    monkeypatch.setattr(cli, 'find_spec', lambda name: None)
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(['AAPL', '--format', 'parquet'])
+    assert exit_info.value.code == 2
+    assert 'pyarrow or fastparquet' in capsys.readouterr().err
+
+def test_parquet_with_an_engine_is_accepted(monkeypatch):
+    monkeypatch.setattr(cli, 'find_spec', lambda name: object() if name == 'fastparquet' else None)
+    assert cli.parse_args(['AAPL', '--format', 'parquet']).format == 'parquet'
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import OHLCVStore
+
+@pytest.fixture
+def daily(ohlcv):
+    df = ohlcv(500, start='2022-01-01', freq='D')
+    df.index.name = 'Date'
+    return df
+
+def test_only_missing_edges_are_downloaded(daily, fake_downloader, tmp_path):
+    downloader = fake_downloader({'AAA': daily})
+    store = OHLCVStore(downloader, root=str(tmp_path))
+
+    data = store.get('AAA', '2022-03-01', '2022-06-01', '1d')
+    pd.testing.assert_frame_equal(data, daily.loc['2022-03-01':'2022-05-31'], check_freq=False)
+    assert downloader.calls == [('AAA', pd.Timestamp('2022-03-01'), pd.Timestamp('2022-06-01'))]
+
+    # Inside the stored range nothing is downloaded
+    store.get('AAA', '2022-04-01', '2022-05-01', '1d')
+    assert len(downloader.calls) == 1
+
+    # A wider range fetches just the two edges
+    data = store.get('AAA', '2022-01-15', '2022-07-01', '1d')
+    assert downloader.calls[1:] == [
+        ('AAA', pd.Timestamp('2022-01-15'), pd.Timestamp('2022-03-01')),
+        ('AAA', pd.Timestamp('2022-06-01'), pd.Timestamp('2022-07-01')),
+    ]
+    pd.testing.assert_frame_equal(data, daily.loc['2022-01-15':'2022-06-30'], check_freq=False)
+    assert store.coverage('AAA', '1d') == (pd.Timestamp('2022-01-15'), pd.Timestamp('2022-07-01'))
+
+def test_overlapping_downloads_are_merged_without_duplicates(daily, fake_downloader, tmp_path):
+    store = OHLCVStore(fake_downloader({}), root=str(tmp_path))
+    first = daily.iloc[:100]
+    # The second download repeats bars, revises them and arrives unsorted with
+    # yfinance's (Price, Ticker) columns
+    second = daily.iloc[80:150].copy()
+    second['Close'] += 1.0
+    second = pd.concat([second, second.iloc[:5]]).iloc[::-1]
+    second.columns = pd.MultiIndex.from_product([second.columns, ['AAA']])
+    store.update('AAA', '1d', first, daily.index[0], daily.index[100])
+    store.update('AAA', '1d', second, daily.index[80], daily.index[150])
+
+    meta, arrays = store.read_arrays('AAA', '1d')
+    index = np.asarray(arrays['index'])
+    assert (np.diff(index) > 0).all()
+    expected = daily.iloc[:150].copy()
+    expected.iloc[80:, expected.columns.get_loc('Close')] += 1.0
+    assert index.tolist() == expected.index.asi8.tolist()
+    np.testing.assert_array_equal(arrays['Close'], expected['Close'].to_numpy())
+    np.testing.assert_array_equal(arrays['Open'], expected['Open'].to_numpy())
+
+def test_intraday_bounds_follow_the_exchange_timezone(ohlcv, fake_downloader, tmp_path):
+    bars = ohlcv(2000, start='2023-03-01 09:30', freq='min')
+    bars.index = bars.index.tz_localize('America/New_York')
+    bars.index.name = 'Date'
+    store = OHLCVStore(fake_downloader({'AAA': bars}), root=str(tmp_path))
+
+    data = store.get('AAA', '2023-03-01 10:00', '2023-03-01 11:00', '1m')
+    assert str(data.index.tz) == 'America/New_York'
+    assert data.index[0] == pd.Timestamp('2023-03-01 10:00', tz='America/New_York')
+    assert data.index[-1] == pd.Timestamp('2023-03-01 10:59', tz='America/New_York')
+    assert len(data) == 60
+    pd.testing.assert_frame_equal(data, bars.iloc[30:90], check_freq=False)
+
+def test_empty_downloads_are_not_cached(daily, fake_downloader, tmp_path):
+    downloader = fake_downloader({'AAA': daily.iloc[:0], 'NONE': None})
+    store = OHLCVStore(downloader, root=str(tmp_path))
+    for ticker in ['AAA', 'NONE']:
+        assert store.get(ticker, '2022-01-01', '2022-02-01', '1d') is None
+        assert store.get(ticker, '2022-01-01', '2022-02-01', '1d') is None
+        assert store.coverage(ticker, '1d') is None
+    # Every request was tried again
+    assert len(downloader.calls) == 4
+
+def test_least_recently_used_series_are_evicted(daily, fake_downloader, tmp_path):
+    histories = {ticker: daily for ticker in ['AAA', 'BBB', 'CCC', 'DDD']}
+    store = OHLCVStore(fake_downloader(histories), root=str(tmp_path))
+    store.get('AAA', '2022-01-01', '2022-12-01', '1d')
+    series_bytes = store.read_arrays('AAA', '1d')[0]['nbytes']
+    store.max_bytes = 3 * series_bytes
+
+    for ticker in ['BBB', 'CCC']:
+        store.get(ticker, '2022-01-01', '2022-12-01', '1d')
+    # Reading AAA makes BBB the least recently used
+    store.get('AAA', '2022-02-01', '2022-03-01', '1d')
+    store.get('DDD', '2022-01-01', '2022-12-01', '1d')
+
+    assert store.coverage('BBB', '1d') is None
+    for ticker in ['AAA', 'CCC', 'DDD']:
+        assert store.coverage(ticker, '1d') is not None
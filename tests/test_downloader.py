@@ -0,0 +1,216 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_handler import get_many
+from data_store import OHLCVStore
+from downloader import RateLimiter, RetryingDownloader, TransientError
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_rate_limiter_allows_a_burst_then_paces_requests():
+    clock = FakeClock()
+    limiter = RateLimiter(2.0, burst=3, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.sleeps == pytest.approx([0.5, 0.5])
+
+    # Idle time refills the bucket, but never past the burst
+    clock.now += 10
+    for _ in range(4):
+        limiter.acquire()
+    assert clock.sleeps == pytest.approx([0.5, 0.5, 0.5])
+
+def test_rate_limiter_queues_concurrent_callers():
+    clock = FakeClock()
+    lock = threading.Lock()
+    waits = []
+
+    def sleep(seconds):
+        with lock:
+            waits.append(seconds)
+
+    limiter = RateLimiter(4.0, burst=1, clock=clock, sleep=sleep)
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # With the clock standing still each caller waits one slot longer
+    assert sorted(waits) == pytest.approx([0.25, 0.5, 0.75, 1.0])
+
+class FlakyTransport:
+    def __init__(self, errors, result='bars'):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, ticker, start, end, interval):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+def test_transient_failures_are_retried_with_growing_backoff():
+    clock = FakeClock()
+    transport = FlakyTransport([TransientError('429'), OSError('reset'), TransientError('503')])
+    downloader = RetryingDownloader(transport, rate=None, retries=3, backoff=1.0, sleep=clock.sleep)
+    assert downloader('AAA', '2024-01-01', '2024-02-01', '1d') == 'bars'
+    assert transport.calls == 4
+    # Exponential backoff with up to 100% jitter
+    for attempt, delay in enumerate(clock.sleeps):
+        assert 2 ** attempt <= delay <= 2 ** (attempt + 1)
+
+def test_retry_after_and_max_backoff_are_honoured():
+    clock = FakeClock()
+    transport = FlakyTransport([TransientError('429', retry_after=7.0), TransientError('503')])
+    downloader = RetryingDownloader(transport, rate=None, backoff=1.0, max_backoff=0.1, sleep=clock.sleep)
+    downloader('AAA', '2024-01-01', '2024-02-01', '1d')
+    assert clock.sleeps[0] == 7.0
+    assert clock.sleeps[1] <= 0.2
+
+def test_permanent_and_exhausted_failures_are_raised():
+    clock = FakeClock()
+    transport = FlakyTransport([ValueError('HTTP 400')])
+    with pytest.raises(ValueError):
+        RetryingDownloader(transport, rate=None, sleep=clock.sleep)('AAA', '2024-01-01', '2024-02-01', '1d')
+    assert transport.calls == 1 and clock.sleeps == []
+
+    transport = FlakyTransport([TransientError('503')] * 3)
+    with pytest.raises(TransientError):
+        RetryingDownloader(transport, rate=None, retries=2, sleep=clock.sleep)('AAA', '2024-01-01', '2024-02-01', '1d')
+    assert transport.calls == 3
+
+class StandInServer:
+    """
+    Local stand-in for a quote server: daily bars as JSON over keep-alive
+    HTTP, 503 with Retry-After for the first requests of 'FLAKY' and 404 for
+    'NONE'
+    """
+
+    def __init__(self, delay=0.02):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                ticker = url.path.rsplit('/', 1)[-1]
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with lock:
+                    server.requests.append(ticker)
+                    attempt = server.requests.count(ticker)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                time.sleep(delay)
+                with lock:
+                    server.in_flight -= 1
+
+                headers = {}
+                if ticker == 'FLAKY' and attempt < 3:
+                    status, body, headers = 503, {}, {'Retry-After': '0.05'}
+                elif ticker == 'NONE':
+                    status, body = 404, {}
+                else:
+                    dates = pd.date_range(query['start'], query['end'], freq='D', inclusive='left')
+                    close = 100 + np.arange(len(dates)) + len(ticker)
+                    status, body = 200, {
+                        'dates': [str(date.date()) for date in dates],
+                        'open': close.tolist(), 'high': (close + 1).tolist(),
+                        'low': (close - 1).tolist(), 'close': close.tolist(),
+                        'volume': [1000] * len(dates),
+                    }
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def transport(self, ticker, start, end, interval):
+        query = urlencode({'start': str(pd.Timestamp(start).date()), 'end': str(pd.Timestamp(end).date())})
+        try:
+            with urllib.request.urlopen(f'{self.url}/bars/{ticker}?{query}', timeout=5) as response:
+                body = json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            if e.code == 429 or e.code >= 500:
+                retry_after = e.headers.get('Retry-After')
+                raise TransientError(f"HTTP {e.code} for {ticker}", float(retry_after) if retry_after else None)
+            raise
+        dates = pd.DatetimeIndex(body.pop('dates'), name='Date')
+        return pd.DataFrame({key.capitalize(): values for key, values in body.items()}, index=dates)
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+def test_get_many_against_a_local_server(server, tmp_path):
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        time.sleep(seconds)
+
+    downloader = RetryingDownloader(server.transport, rate=200.0, burst=8, backoff=0.01, sleep=sleep)
+    store = OHLCVStore(downloader, root=str(tmp_path))
+    tickers = [f'T{k}' for k in range(20)] + ['FLAKY', 'NONE']
+    results = {ticker: (data, error) for ticker, data, error in
+               get_many(tickers, '2024-01-01', '2024-02-01', '1d', max_workers=8, source=store)}
+
+    assert set(results) == set(tickers)
+    assert server.max_in_flight > 1
+    data, error = results['T3']
+    assert error is None and len(data) == 31 and data['Close'].iloc[0] == 102
+    # FLAKY succeeded on its third attempt after waiting at least Retry-After
+    assert results['FLAKY'][1] is None and server.requests.count('FLAKY') == 3
+    assert sum(1 for seconds in sleeps if seconds >= 0.05) >= 2
+    assert results['NONE'][0] is None and 'No data found' in results['NONE'][1]
+
+    # Everything that arrived was stored, so a second pass makes no requests
+    requests = len(server.requests)
+    again = list(get_many(tickers[:20], '2024-01-05', '2024-01-20', '1d', source=store))
+    assert len(server.requests) == requests
+    assert all(data is not None for _, data, _ in again)
+
+def test_get_many_stops_queued_downloads_when_the_caller_stops(server, tmp_path):
+    store = OHLCVStore(RetryingDownloader(server.transport, rate=None), root=str(tmp_path))
+    results = get_many([f'T{k}' for k in range(20)], '2024-01-01', '2024-02-01', '1d', max_workers=2, source=store)
+    next(results)
+    results.close()
+    assert len(server.requests) < 20
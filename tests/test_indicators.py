@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import (
+    calculate_ema, detect_ema_signals, detect_patterns, detect_pivots, detect_structure, generate_signals, is_pivot
+)
+from streaming import SignalEngine
+
+# Reference: the original per-candle loop
+def _ema_signals_loop(df, ema_col, backcandles):
+    signals = [0] * len(df)
+    for row in range(backcandles, len(df)):
+        upt = 1
+        dnt = 1
+        for i in range(row - backcandles, row + 1):
+            open_val = df['Open'].values[i]
+            close_val = df['Close'].values[i]
+            ema_val = df[ema_col].values[i]
+            if max(open_val, close_val) >= ema_val:
+                dnt = 0
+            if min(open_val, close_val) <= ema_val:
+                upt = 0
+        if upt == 1 and dnt == 1:
+            signals[row] = 3
+        elif upt == 1:
+            signals[row] = 2
+        elif dnt == 1:
+            signals[row] = 1
+    return signals
+
+# Reference: the original per-candle pivot check
+def _is_pivot_loop(df, candle_index, window):
+    if candle_index - window < 0 or candle_index + window >= len(df):
+        return 0
+    current_high = df['High'].values[candle_index]
+    current_low = df['Low'].values[candle_index]
+    pivot_high = 1
+    pivot_low = 2
+    for i in range(candle_index - window, candle_index + window + 1):
+        if i == candle_index:
+            continue
+        if current_low > df['Low'].values[i]:
+            pivot_low = 0
+        if current_high < df['High'].values[i]:
+            pivot_high = 0
+    if pivot_high and pivot_low:
+        return 3
+    elif pivot_high:
+        return pivot_high
+    elif pivot_low:
+        return pivot_low
+    else:
+        return 0
+
+# Reference: the original per-candle structure check
+def _detect_structure_loop(df, candle_index, backcandles, window):
+    if (candle_index <= (backcandles + window)) or (candle_index + window + 1 >= len(df)):
+        return 0
+    local_df = df.iloc[candle_index - backcandles - window:candle_index - window].copy()
+    highs = local_df[local_df['isPivot'] == 1]['High'].tail(3).values
+    lows = local_df[local_df['isPivot'] == 2]['Low'].tail(3).values
+    zone_width = 0.001
+    current_close = df['Close'].values[candle_index]
+    if len(lows) == 3:
+        mean_low = lows.mean()
+        support_condition = all(abs(low - mean_low) <= zone_width for low in lows)
+        if support_condition and (mean_low - current_close) > zone_width * 2:
+            return 1
+    if len(highs) == 3:
+        mean_high = highs.mean()
+        resistance_condition = all(abs(high - mean_high) <= zone_width for high in highs)
+        if resistance_condition and (current_close - mean_high) > zone_width * 2:
+            return 2
+    return 0
+
+# Reference: the original signal combination
+def _generate_signals_loop(df):
+    signals = [0] * len(df)
+    for i in range(len(df)):
+        if df['isPivot'].values[i] == 2 or df['pattern_detected'].values[i] == 2:
+            signals[i] = 1
+        elif df['isPivot'].values[i] == 1 or df['pattern_detected'].values[i] == 1:
+            signals[i] = -1
+    return signals
+
+def _random_frame(ohlcv, rng, n, nan_rate):
+    df = ohlcv(n, seed=int(rng.integers(2 ** 31)), nan_rate=nan_rate)
+    df['EMA'] = calculate_ema(df, int(rng.integers(2, 30)))
+    # Missing values in the EMA too, beyond those its missing closes cause
+    df.loc[rng.random(n) < nan_rate / 4, 'EMA'] = np.nan
+    return df
+
+@pytest.mark.parametrize('seed', range(100))
+def test_detect_ema_signals_matches_loop(ohlcv, seed):
+    rng = np.random.default_rng(seed)
+    df = _random_frame(ohlcv, rng, int(rng.integers(1, 120)), 0.0 if seed < 20 else 0.1)
+    backcandles = int(rng.integers(0, 12))
+    expected = _ema_signals_loop(df, 'EMA', backcandles)
+    assert detect_ema_signals(df, 'EMA', backcandles).tolist() == expected
+
+def test_detect_ema_signals_single_missing_body_side():
+    # A NaN close leaves the open as the body, a NaN open makes it unknown
+    df = pd.DataFrame({
+        'Open': [0.970, 0.970, np.nan, np.nan],
+        'Close': [np.nan, np.nan, 0.980, 0.980],
+        'EMA': [0.9725, 0.9725, 0.9725, 0.9725],
+    })
+    expected = _ema_signals_loop(df, 'EMA', 1)
+    assert expected == [0, 1, 1, 3]
+    assert detect_ema_signals(df, 'EMA', 1).tolist() == expected
+
+@pytest.mark.parametrize('seed', range(20))
+def test_streaming_ema_signals_match_batch(ohlcv, seed):
+    rng = np.random.default_rng(seed)
+    df = _random_frame(ohlcv, rng, 200, 0.1)
+    engine = SignalEngine(20, 5, 3, 20, 3)
+    bars = [engine.update(date, *row) for date, row in
+            enumerate(df[['Open', 'High', 'Low', 'Close']].itertuples(index=False))]
+    bars = [bar for bar in bars if bar is not None] + engine.flush()
+    df['EMA'] = calculate_ema(df, 20)
+    assert [bar.ema_signal for bar in bars] == detect_ema_signals(df, 'EMA', 5).tolist()
+
+# Prices on a tick grid make equal highs and lows (ties) and tight pivot
+# zones, so breakouts are common; some seeds also have missing prices and bars
+def _structure_frame(ohlcv, seed, n):
+    rng = np.random.default_rng(seed)
+    tick = [None, 0.0005, 0.001][seed % 3]
+    nan_rate = 0.0 if seed < 10 else 0.03
+    return ohlcv(n, seed=seed, tick=tick, nan_rate=nan_rate, missing_rate=nan_rate / 2,
+                 volatility=float(rng.uniform(0.0003, 0.0015)))
+
+@pytest.mark.parametrize('seed', range(30))
+def test_detect_pivots_matches_loop(ohlcv, seed):
+    rng = np.random.default_rng(seed)
+    df = _structure_frame(ohlcv, seed, int(rng.integers(1, 150)))
+    window = int(rng.integers(0, 12))
+    expected = [_is_pivot_loop(df, i, window) for i in range(len(df))]
+    assert detect_pivots(df['High'], df['Low'], window).tolist() == expected
+    assert [is_pivot(df, i, window) for i in range(len(df))] == expected
+
+@pytest.mark.parametrize('seed', range(20))
+def test_detect_patterns_matches_loop(ohlcv, seed):
+    rng = np.random.default_rng(seed)
+    df = _structure_frame(ohlcv, seed, 300)
+    window = int(rng.integers(1, 8))
+    backcandles = int(rng.integers(10, 60))
+    df['isPivot'] = [_is_pivot_loop(df, i, window) for i in range(len(df))]
+    expected = [_detect_structure_loop(df, i, backcandles, window) for i in range(len(df))]
+    patterns = detect_patterns(df['Close'], df['High'], df['Low'], df['isPivot'], backcandles, window)
+    assert patterns.tolist() == expected
+    assert [detect_structure(df, i, backcandles, window) for i in range(0, len(df), 7)] == expected[::7]
+
+    df['pattern_detected'] = patterns
+    assert generate_signals(df).tolist() == _generate_signals_loop(df)
+
+def test_structure_frames_have_breakouts(ohlcv):
+    # Guards the tests above against only ever comparing zeros
+    found = set()
+    for seed in range(20):
+        df = _structure_frame(ohlcv, seed, 300)
+        df['isPivot'] = detect_pivots(df['High'], df['Low'], 3)
+        found.update(detect_patterns(df['Close'], df['High'], df['Low'], df['isPivot'], 30, 3).tolist())
+    assert found == {0, 1, 2}
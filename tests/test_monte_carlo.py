@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import pipeline
+from backtester import backtest_strategy, simulate_trades
+from monte_carlo import monte_carlo, simulate_paths, trade_returns
+
+def _backtest(ohlcv, seed, risk):
+    df = ohlcv(3000, seed=seed, tick=0.0005)
+    df = pipeline.process_data(df, 20, 5, 5, 30, 5, cache=pipeline.StageCache())
+    return df, simulate_trades(df['Close'], df['signal'], 10000.0, risk, 0.3, 0.5)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_shuffled_paths_end_at_the_backtest_balance(ohlcv, seed):
+    _, (trades, balance) = _backtest(ohlcv, seed, 2.0)
+    assert len(trades['entry_bar']) > 10
+
+    # Compounding commutes, so every ordering of the trades ends at the same balance
+    paths = simulate_paths(trade_returns(trades), 10000.0, n_paths=500, method='shuffle', seed=seed,
+                           chunk_cells=len(trades['entry_bar']) * 7)
+    np.testing.assert_allclose(paths['final_balance'], balance, rtol=1e-9)
+    assert (paths['min_balance'] <= np.minimum(paths['final_balance'], 10000.0)).all()
+    assert len(np.unique(paths['max_drawdown'])) > 1
+
+def test_risk_scale_matches_a_backtest_at_that_risk(ohlcv):
+    _, (trades, _) = _backtest(ohlcv, 0, 1.0)
+    _, (_, balance) = _backtest(ohlcv, 0, 3.0)
+    paths = simulate_paths(trade_returns(trades), 10000.0, n_paths=50, method='shuffle', risk_scale=3.0, seed=0)
+    np.testing.assert_allclose(paths['final_balance'], balance, rtol=1e-9)
+
+def test_trade_frame_and_trade_log_give_the_same_returns(ohlcv):
+    df, (trades, _) = _backtest(ohlcv, 1, 2.0)
+    trades_df, balance = backtest_strategy(df, 10000.0, 2.0, 0.3, 0.5)
+    np.testing.assert_allclose(trade_returns(trades_df), trade_returns(trades))
+
+    summary, paths = monte_carlo(trades_df, 10000.0, n_paths=200, method='shuffle', seed=1)
+    assert summary['Mean Final Balance'] == pytest.approx(balance)
+    assert summary['Probability of Loss'] in (0.0, 100.0)
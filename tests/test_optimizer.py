@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+import optimizer
+import pipeline
+from backtester import backtest_strategy
+
+GRID = {
+    'window': [3, 5, 8],
+    'pattern_backcandles': [20, 30],
+    'pattern_window': [3, 5],
+    'stop_loss_percentage': [0.3, 0.5],
+    'take_profit_percentage': [0.5, 1.0],
+}
+
+@pytest.fixture
+def sweep_prices(ohlcv):
+    return ohlcv(1500, seed=2, tick=0.0005, missing_rate=0.01)
+
+def test_sweep_rows_match_individual_backtests(sweep_prices):
+    results = optimizer.run_sweep(sweep_prices, GRID, max_workers=1)
+    assert len(results) == 3 * 2 * 2 * 2 * 2
+    assert results['Return (%)'].is_monotonic_decreasing
+    assert not optimizer._shared
+
+    cache = pipeline.StageCache()
+    for row in results.to_dict('records'):
+        df = pipeline.process_data(sweep_prices, 20, 5, row['window'], row['pattern_backcandles'],
+                                   row['pattern_window'], cache=cache)
+        trades, balance = backtest_strategy(df, 10000.0, row['risk_percentage'],
+                                            row['stop_loss_percentage'], row['take_profit_percentage'])
+        assert row['Total Trades'] == len(trades)
+        assert row['Final Balance'] == balance
+
+def test_process_pool_matches_serial_sweep(sweep_prices):
+    serial = optimizer.run_sweep(sweep_prices, GRID, max_workers=1)
+    pooled = optimizer.run_sweep(sweep_prices, GRID, max_workers=2)
+    pd.testing.assert_frame_equal(pooled, serial)
+
+def test_unknown_parameter_is_rejected(sweep_prices):
+    with pytest.raises(ValueError, match='ema_period'):
+        optimizer.run_sweep(sweep_prices, {'ema_period': [10, 20]}, max_workers=1)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import pipeline
+from indicators import detect_pivots
+
+PARAMS = dict(ema_period=20, backcandles=5, pattern_backcandles=30, pattern_window=5)
+
+def _stages(cache):
+    return [key[0] for key in cache._entries]
+
+def test_pivot_radii_built_only_for_a_second_window(ohlcv):
+    df = ohlcv()
+    cache = pipeline.StageCache()
+    pipeline.process_data(df, window=10, cache=cache, **PARAMS)
+    assert 'pivot_radii' not in _stages(cache)
+
+    # Asking for the same window again is a cache hit, not a reason to build them
+    pipeline.process_data(df, window=10, cache=cache, **PARAMS)
+    assert 'pivot_radii' not in _stages(cache)
+
+    for window in [5, pipeline.PIVOT_RADIUS_CAP, 3, pipeline.PIVOT_RADIUS_CAP + 5]:
+        out = pipeline.process_data(df, window=window, cache=cache, **PARAMS)
+        assert 'pivot_radii' in _stages(cache)
+        assert np.array_equal(out['isPivot'], detect_pivots(df['High'], df['Low'], window))
+
+@pytest.mark.parametrize('chunk_bars', [1, 7, 64, 333, 10**6])
+def test_process_arrays_matches_process_data_for_any_chunk(ohlcv, tmp_path, chunk_bars):
+    # Rounded prices so that patterns actually form
+    df = ohlcv(n=800, seed=3, nan_rate=0.01, missing_rate=0.02, tick=0.001)
+    # Missing bars at the start and a gap longer than most of the chunks
+    df.iloc[:12, :4] = np.nan
+    df.iloc[400:550, :4] = np.nan
+    params = dict(PARAMS, window=8)
+    expected = pipeline.process_data(df, cache=pipeline.StageCache(), **params)
+
+    arrays = {column: df[column].to_numpy() for column in ['Open', 'High', 'Low', 'Close']}
+    out = pipeline.process_arrays(arrays, tmp_path, chunk_bars=chunk_bars, **params)
+    for column, dtype in pipeline.OUTPUT_DTYPES.items():
+        assert out[column].dtype == dtype
+        np.testing.assert_array_equal(out[column], expected[column].to_numpy(), err_msg=column)
+    assert expected['pattern_detected'].abs().sum() > 0
+
+def test_cached_trade_log_cannot_be_changed_by_callers(ohlcv):
+    df = ohlcv(tick=0.0005)
+    cache = pipeline.StageCache()
+    args = (5, 30, 5, 10000.0, 2.0, 0.3, 0.5)
+    trades, balance = pipeline.backtest_log(df, *args, cache=cache)
+    entry_bar = trades['entry_bar'].copy()
+    assert len(entry_bar) > 0
+
+    with pytest.raises(ValueError):
+        trades['entry_bar'] += 100
+    # Shifting into a new array, as walk_forward does with its own logs
+    trades['entry_bar'] = trades['entry_bar'] + 100
+
+    again, again_balance = pipeline.backtest_log(df, *args, cache=cache)
+    assert cache.hits > 0 and again_balance == balance
+    np.testing.assert_array_equal(again['entry_bar'], entry_bar)
+    assert all(not array.flags.writeable for array in again.values())
+
+def test_processed_frame_is_writable_without_touching_the_cache(ohlcv):
+    df = ohlcv()
+    close = df['Close'].to_numpy().copy()
+    cache = pipeline.StageCache()
+    out = pipeline.process_data(df, window=5, cache=cache, **PARAMS)
+    signal = out['signal'].to_numpy().copy()
+
+    out.loc[out.index[10], 'signal'] = 1
+    out.loc[out.index[10], 'EMA'] = 0.0
+    out.loc[out.index[10], 'Close'] = 0.0
+    assert out['signal'].iloc[10] == 1 and out['signal'].dtype == np.int8
+
+    again = pipeline.process_data(df, window=5, cache=cache, **PARAMS)
+    assert cache.hits > 0
+    np.testing.assert_array_equal(again['signal'], signal)
+    np.testing.assert_array_equal(df['Close'], close)
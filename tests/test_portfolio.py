@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+import data_handler
+import portfolio
+from backtester import backtest_strategy
+from data_store import OHLCVStore
+
+ARGS = (5, 30, 5, 10000.0, 2.0, 0.3, 0.5)
+
+@pytest.fixture
+def fake_store(ohlcv, monkeypatch, tmp_path):
+    """
+    Points data_handler at a store in tmp_path whose downloader serves daily
+    bars from a fixed synthetic history; 'NONE' has no data
+    """
+    history = {}
+
+    def download(ticker, start, end, interval):
+        if ticker == 'NONE':
+            return None
+        if ticker not in history:
+            history[ticker] = ohlcv(2000, seed=len(history), start='2020-01-01', freq='D', tick=0.0005)
+        df = history[ticker]
+        return df[(df.index >= start) & (df.index < end)]
+
+    monkeypatch.setattr(data_handler, '_store', OHLCVStore(download, root=str(tmp_path)))
+    monkeypatch.setattr(data_handler, '_resampler', None)
+    monkeypatch.setattr(data_handler, '_stored', None)
+    return history
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_unavailable_tickers_are_reported_missing(fake_store, max_workers):
+    trades, balance, missing = portfolio.run_portfolio(
+        ['AAA', 'NONE'], '2022-01-01', '2024-01-01', '1d', *ARGS, max_workers=max_workers)
+    assert missing == ['NONE']
+    assert len(trades) > 0 and set(trades['Ticker']) == {'AAA'}
+
+    # 1m bars that far back can't be downloaded; the error must not escape the worker
+    trades, balance, missing = portfolio.run_portfolio(
+        ['AAA'], '2022-01-01', '2024-01-01', '1m', *ARGS, max_workers=max_workers)
+    assert missing == ['AAA'] and trades.empty and balance == 10000.0
+
+@pytest.mark.parametrize('seed', range(8))
+def test_one_ticker_matches_backtest_strategy(ohlcv, seed):
+    df = ohlcv(1500, seed=seed, start='2020-01-01', freq='D', tick=0.0005, missing_rate=0.01)
+    window, pattern_backcandles, pattern_window, balance, risk, sl, tp = ARGS
+    symbol = portfolio.symbol_signals('AAA', lambda *_: df, None, None, '1d',
+                                      window, pattern_backcandles, pattern_window)
+    trades, final = portfolio.simulate_portfolio([symbol], balance, risk, sl, tp, max_positions=1)
+
+    expected, expected_final = backtest_strategy(df.assign(signal=symbol[3]), balance, risk, sl, tp)
+    assert len(expected) > 0 and (trades['Ticker'] == 'AAA').all()
+    pd.testing.assert_frame_equal(trades.drop(columns='Ticker'), expected.reset_index(drop=True),
+                                  check_index_type=False)
+    assert final == expected_final
@@ -0,0 +1,15 @@
+import asyncio
+
+import pandas as pd
+
+import replay
+
+def test_second_run_does_not_repeat_trades(ohlcv):
+    strategies = {f's{i}': dict(window=5, stop_loss_percentage=1.0 + i) for i in range(3)}
+    report, service = replay.replay(ohlcv(3000, seed=1), strategies)
+    assert report['Trades'].sum() > 0
+
+    again = asyncio.run(service.run())
+    pd.testing.assert_frame_equal(again, report)
+    for name in strategies:
+        assert len(service.trades(name)) == report.loc[name, 'Trades']
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import resample
+from data_store import OHLCVStore
+from resample import ResampleCache, resample_ohlcv
+
+TZ = 'America/New_York'
+AGGREGATIONS = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+@pytest.fixture
+def session_bars(ohlcv):
+    """
+    5m bars of regular 9:30-16:00 New York sessions across the March 2023
+    daylight saving change, with some missing prices
+    """
+    days = pd.bdate_range('2023-03-06', '2023-03-24')
+    times = pd.timedelta_range('9:30:00', '15:55:00', freq='5min')
+    index = pd.DatetimeIndex([day + time for day in days for time in times]).tz_localize(TZ)
+    df = ohlcv(len(index), seed=5, nan_rate=0.02)
+    df.index = index.rename('Date')
+    return df
+
+# Reference: group each 5m bar by its hour counted from the day's first bar, with pandas
+def _reference_1h(bars, start, end):
+    wall = bars.index.tz_localize(None)
+    day_open = pd.Series(wall, index=wall).groupby(wall.normalize()).transform('min').to_numpy()
+    key = day_open + (wall.to_numpy() - day_open) // pd.Timedelta(hours=1) * pd.Timedelta(hours=1)
+    inside = (bars.index >= pd.Timestamp(start, tz=TZ)) & (bars.index < pd.Timestamp(end, tz=TZ))
+    grouped = bars[inside].groupby(pd.DatetimeIndex(key[inside]).tz_localize(TZ)).agg(AGGREGATIONS)
+    grouped.index.name = 'Date'
+    return grouped
+
+def _cache(fake_downloader, bars, tmp_path):
+    store = OHLCVStore(fake_downloader({'AAA': bars}), root=str(tmp_path))
+    # The range is too old to download 1m bars, so the stored 5m series is the base
+    store.get('AAA', '2023-03-06', '2023-03-07', '5m')
+    return ResampleCache(store), store
+
+def test_hourly_bars_are_anchored_on_the_session_open(session_bars, fake_downloader, tmp_path):
+    cache, _ = _cache(fake_downloader, session_bars, tmp_path)
+    hourly = cache.get('AAA', '2023-03-06', '2023-03-18', '1h')
+    assert str(hourly.index.tz) == TZ
+    # Seven bars a day, 9:30 to 15:30 local time on both sides of the clock change
+    assert len(hourly) == 7 * 10
+    assert set(hourly.index.strftime('%H:%M')) == {f'{hour:02d}:30' for hour in range(9, 16)}
+    assert hourly.index[0] == pd.Timestamp('2023-03-06 09:30', tz=TZ)
+    assert hourly.index[-1] == pd.Timestamp('2023-03-17 15:30', tz=TZ)
+    # The last bar of a session covers only 15:30-16:00
+    pd.testing.assert_frame_equal(hourly, _reference_1h(session_bars, '2023-03-06', '2023-03-18'),
+                                  check_dtype=False, check_freq=False)
+
+def test_partial_first_and_last_groups_use_only_bars_in_range(session_bars, fake_downloader, tmp_path):
+    cache, _ = _cache(fake_downloader, session_bars, tmp_path)
+    # Warm the cache over the whole stored range, then ask for a cut-out
+    cache.get('AAA', '2023-03-06', '2023-03-18', '1h')
+    for start, end in [('2023-03-08 10:10', '2023-03-10 14:20'), ('2023-03-13 09:35', '2023-03-13 09:50'),
+                       ('2023-03-09 11:30', '2023-03-15 11:30')]:
+        hourly = cache.get('AAA', start, end, '1h')
+        expected = _reference_1h(session_bars, start, end)
+        pd.testing.assert_frame_equal(hourly, expected, check_dtype=False, check_freq=False)
+        # Labels stay on the session grid, so a cut-out group keeps its start
+        assert hourly.index[0] <= pd.Timestamp(start, tz=TZ)
+
+def test_incremental_extension_equals_a_fresh_resample(session_bars, fake_downloader, tmp_path, monkeypatch):
+    cache, store = _cache(fake_downloader, session_bars, tmp_path)
+    cache.get('AAA', '2023-03-06', '2023-03-14 12:00', '1h')
+
+    # Extending the stored series regroups only from the last final day on,
+    # including stored ends that cut an hour (and a session) in two
+    grouped = []
+    bucket_starts = resample.bucket_starts
+    monkeypatch.setattr(resample, 'bucket_starts', lambda index, interval: (
+        grouped.append(len(index)) or bucket_starts(index, interval)))
+    for end in ['2023-03-14 12:10', '2023-03-14 15:00', '2023-03-15 09:50', '2023-03-16', '2023-03-20 10:45',
+                '2023-03-25']:
+        hourly = cache.get('AAA', '2023-03-06', end, '1h')
+        stored = store.get('AAA', '2023-03-06', end, '5m')
+        assert grouped[-1] < len(stored)
+        pd.testing.assert_frame_equal(hourly, resample_ohlcv(stored, '1h'), check_freq=False)
+        pd.testing.assert_frame_equal(hourly, _reference_1h(session_bars, '2023-03-06', end),
+                                      check_dtype=False, check_freq=False)
+
+    # A fresh cache over the same store gives the same bars
+    fresh = ResampleCache(store).get('AAA', '2023-03-06', '2023-03-25', '1h')
+    pd.testing.assert_frame_equal(hourly, fresh, check_freq=False)
+
+def test_bars_after_the_covered_end_are_regrouped_when_revised(session_bars, fake_downloader, tmp_path):
+    store = OHLCVStore(fake_downloader({}), root=str(tmp_path))
+    cache = ResampleCache(store)
+    # Stored bars run past the covered end, as today's bars do; those may still change
+    end = '2023-03-14 11:00'
+    bars = session_bars[session_bars.index < pd.Timestamp('2023-03-14 12:00', tz=TZ)]
+    store.update('AAA', '5m', bars, '2023-03-06', end)
+    first = cache.get('AAA', '2023-03-06', '2023-03-15', '1h')
+    pd.testing.assert_frame_equal(first, resample_ohlcv(bars, '1h'), check_freq=False)
+
+    revised = bars[bars.index >= pd.Timestamp(end, tz=TZ)].copy()
+    revised['Close'] += 1.0
+    store.update('AAA', '5m', revised, end, end)
+    bars = pd.concat([bars[bars.index < pd.Timestamp(end, tz=TZ)], revised])
+    again = cache.get('AAA', '2023-03-06', '2023-03-15', '1h')
+    pd.testing.assert_frame_equal(again, resample_ohlcv(bars, '1h'), check_freq=False)
+    assert again['Close'].iloc[-1] == first['Close'].iloc[-1] + 1.0
+
+@pytest.mark.parametrize('interval, rule', [('1wk', 'W-MON'), ('1mo', 'MS')])
+def test_calendar_intervals_match_pandas(ohlcv, interval, rule):
+    daily = ohlcv(400, seed=2, start='2022-01-03', freq='B', nan_rate=0.02)
+    daily.index.name = 'Date'
+    expected = daily.resample(rule, label='left', closed='left').agg(AGGREGATIONS)
+    pd.testing.assert_frame_equal(resample_ohlcv(daily, interval), expected, check_dtype=False, check_freq=False)
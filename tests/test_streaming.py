@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pipeline
+from backtester import backtest_strategy
+from indicators import calculate_ema
+from streaming import StrategyEngine
+
+@pytest.mark.parametrize('seed', range(12))
+def test_replay_matches_batch_pipeline_and_backtest(ohlcv, seed):
+    rng = np.random.default_rng(seed)
+    df = ohlcv(int(rng.integers(50, 1500)), seed=seed, tick=[None, 0.0005][seed % 2],
+               nan_rate=0.0 if seed < 8 else 0.01)
+    ema_period = int(rng.integers(5, 60))
+    backcandles = int(rng.integers(1, 20))
+    window = int(rng.integers(1, 10))
+    pattern_backcandles = int(rng.integers(10, 60))
+    pattern_window = int(rng.integers(1, 10))
+    risk = (10000.0, 2.0, float(rng.uniform(0.05, 0.3)), float(rng.uniform(0.05, 0.6)))
+
+    expected = pipeline.process_data(df, ema_period, backcandles, window, pattern_backcandles, pattern_window,
+                                     cache=pipeline.StageCache())
+    expected_trades, expected_balance = backtest_strategy(expected, *risk)
+
+    engine = StrategyEngine(ema_period, backcandles, window, pattern_backcandles, pattern_window, *risk)
+    bars = []
+    for date, row in zip(df.index, df[['Open', 'High', 'Low', 'Close']].itertuples(index=False)):
+        bar = engine.update(date, *row)
+        if bar is not None:
+            bars.append(bar)
+            # A bar is final only once `lag` later bars have arrived
+            assert bar.position == len(bars) - 1 == engine.signals.count - 1 - engine.lag
+    bars += engine.finish()
+
+    assert [bar.position for bar in bars] == list(range(len(df)))
+    assert [bar.date for bar in bars] == list(df.index)
+    np.testing.assert_array_equal([bar.ema for bar in bars], calculate_ema(df, ema_period).to_numpy())
+    assert [bar.ema_signal for bar in bars] == expected['EMASignal'].tolist()
+    assert [bar.pivot for bar in bars] == expected['isPivot'].tolist()
+    assert [bar.pattern for bar in bars] == expected['pattern_detected'].tolist()
+    assert [bar.signal for bar in bars] == expected['signal'].tolist()
+
+    trades = pd.DataFrame(engine.trades, columns=expected_trades.columns)
+    assert len(trades) == len(expected_trades)
+    pd.testing.assert_frame_equal(trades, expected_trades, check_dtype=False)
+    np.testing.assert_equal(engine.balance, expected_balance)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from backtester import simulate_trades
+from indicators import combine_signals, detect_patterns, detect_pivots
+from optimizer import summarize_trades
+from walk_forward import make_folds, run_walk_forward
+
+GRID = {
+    'window': [3, 5],
+    'pattern_backcandles': [30],
+    'pattern_window': [5],
+    'stop_loss_percentage': [0.1, 0.3],
+    'take_profit_percentage': [0.2, 0.5],
+}
+
+@pytest.mark.parametrize('step', [250, 750])
+def test_step_other_than_test_bars_is_rejected(ohlcv, step):
+    # 250 would overlap the test slices and count trades twice, 750 would skip bars
+    with pytest.raises(ValueError):
+        make_folds(4000, 1000, 500, step)
+    with pytest.raises(ValueError):
+        run_walk_forward(ohlcv(4000, seed=3, tick=0.0005), GRID, 1000, 500, step=step, max_workers=1)
+
+def test_test_slices_tile_the_history():
+    folds = make_folds(4000, 1000, 500, 500)
+    assert [fold[2] for fold in folds] == [1000, 1500, 2000, 2500, 3000, 3500]
+    assert all(a[3] == b[2] for a, b in zip(folds, folds[1:]))
+    assert folds[-1][3] == 4000
+
+def test_out_of_sample_trades_chain_in_order(ohlcv):
+    trades, report, balance = run_walk_forward(ohlcv(4000, seed=3, tick=0.0005), GRID, 1000, 500, max_workers=1)
+    assert len(trades) == report['Test Trades'].sum() > 0
+    assert trades['Entry Date'].is_monotonic_increasing
+    assert (trades['Entry Date'].iloc[1:].to_numpy() >= trades['Exit Date'].iloc[:-1].to_numpy()).all()
+    assert trades['Balance'].iloc[-1] == balance == report['Balance'].iloc[-1]
+
+def test_lower_is_better_metric_is_minimized(ohlcv):
+    df = ohlcv(4000, seed=3, tick=0.0005)
+    metric = 'Max Drawdown (%)'
+    _, report, _ = run_walk_forward(df, GRID, 1000, 500, metric=metric, max_workers=1)
+
+    close, high, low = (df[column].to_numpy() for column in ['Close', 'High', 'Low'])
+    signals = {}
+    for window in GRID['window']:
+        pivots = detect_pivots(high, low, window)
+        signals[window] = combine_signals(pivots, detect_patterns(close, high, low, pivots, 30, 5))
+    for _, row in report.iterrows():
+        train = slice(df.index.get_loc(row['Train Start']), df.index.get_loc(row['Train End']) + 1)
+        scores = []
+        for window in GRID['window']:
+            for sl in GRID['stop_loss_percentage']:
+                for tp in GRID['take_profit_percentage']:
+                    trades, final_balance = simulate_trades(close[train], signals[window][train], 10000.0, 2.0, sl, tp)
+                    scores.append(summarize_trades(close[train], trades, final_balance, 10000.0)[metric])
+        assert row[f'Train {metric}'] == min(scores)
+        assert min(scores) < max(scores)
@@ -1,8 +1,74 @@
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 
-def create_chart(df, ticker, ema_period, plot_range=200):
+# Function to merge consecutive candles so at most max_bars remain
+def downsample_ohlc(df, max_bars):
+    """
+    Each bucket keeps its first open, highest high, lowest low and last close,
+    so no price extreme disappears from the chart
+    """
+    if len(df) <= max_bars:
+        return df[['Open', 'High', 'Low', 'Close']]
+    size = -(-len(df) // max_bars)
+    starts = np.arange(0, len(df), size)
+    ends = np.minimum(starts + size, len(df)) - 1
+    return pd.DataFrame({
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.fmax.reduceat(df['High'].to_numpy(dtype=float), starts),
+        'Low': np.fmin.reduceat(df['Low'].to_numpy(dtype=float), starts),
+        'Close': df['Close'].to_numpy()[ends],
+    }, index=df.index[starts])
+
+# Function to pick the points of a line that best preserve its shape
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets decimation
+    Returns: sorted positions of the threshold points to keep (first and last included)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    edges = np.append(edges, n)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_x = x[hi:edges[b + 2]].mean()
+        next_y = y[hi:edges[b + 2]].mean()
+        # Keep the point forming the largest triangle with the last kept
+        # point and the next bucket's average
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[b + 1] = a
+    return selected
+
+# Function to decimate a time series for plotting
+def decimate_series(index, values, max_points):
+    values = np.asarray(values, dtype=float).reshape(-1)
+    if len(values) <= max_points:
+        return index, values
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(values))
+    keep = lttb(x, values, max_points)
+    return index[keep], values[keep]
+
+def create_chart(df, ticker, ema_period, plot_range=200, max_points=2000):
+    """
+    Candlestick chart with EMA, pivot and breakout markers
+    plot_range: number of most recent bars to show, None for all of them
+    max_points: candles beyond this are merged per bucket and the EMA is
+    decimated with LTTB; markers are always drawn for every pivot and
+    breakout, and line/marker traces use WebGL
+    """
     # Select a slice of data for visualization
-    if len(df) > plot_range:
+    if plot_range is not None and len(df) > plot_range:
         df_plot = df.iloc[-plot_range:]
     else:
         df_plot = df
@@ -11,21 +77,24 @@ def create_chart(df, ticker, ema_period, plot_range=200):
     fig = go.Figure()
     
     # Add candlestick chart
+    candles = downsample_ohlc(df_plot, max_points)
     fig.add_trace(go.Candlestick(
-        x=df_plot.index,
-        open=df_plot['Open'],
-        high=df_plot['High'],
-        low=df_plot['Low'],
-        close=df_plot['Close'],
+        x=candles.index,
+        open=candles['Open'],
+        high=candles['High'],
+        low=candles['Low'],
+        close=candles['Close'],
         name="Price",
         increasing=dict(line=dict(color='green'), fillcolor='green'),  # Bullish candles
         decreasing=dict(line=dict(color='red'), fillcolor='red')        # Bearish candles
     ))
     
     # Add EMA line
-    fig.add_trace(go.Scatter(
-        x=df_plot.index,
-        y=df_plot['EMA'],
+    ema_x, ema_y = decimate_series(df_plot.index, df_plot['EMA'], max_points)
+    fig.add_trace(go.Scattergl(
+        x=ema_x,
+        y=ema_y,
+        mode="lines",
         line=dict(color='blue', width=1),
         name=f"EMA {ema_period}"
     ))
@@ -36,7 +105,7 @@ def create_chart(df, ticker, ema_period, plot_range=200):
     
     # Add pivot highs
     if not pivot_highs.empty:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=pivot_highs.index,
             y=pivot_highs['High'] * 1.001,  # Offset for visibility (1% above the high)
             mode="markers",
@@ -46,7 +115,7 @@ def create_chart(df, ticker, ema_period, plot_range=200):
     
     # Add pivot lows
     if not pivot_lows.empty:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=pivot_lows.index,
             y=pivot_lows['Low'] * 0.999,  # Offset for visibility (1% below the low)
             mode="markers",
@@ -60,7 +129,7 @@ def create_chart(df, ticker, ema_period, plot_range=200):
     
     # Add support break markers
     if not support_breaks.empty:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=support_breaks.index,
             y=support_breaks['Low'] * 0.99,  # Offset for visibility (1% below the low)
             mode="markers",
@@ -70,7 +139,7 @@ def create_chart(df, ticker, ema_period, plot_range=200):
     
     # Add resistance break markers
     if not resistance_breaks.empty:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=resistance_breaks.index,
             y=resistance_breaks['High'] * 1.01,  # Offset for visibility (1% above the high)
             mode="markers",
@@ -94,4 +163,51 @@ def create_chart(df, ticker, ema_period, plot_range=200):
         height=600
     )
     
+    return fig
+
+def create_equity_chart(index, equity, max_points=2000):
+    """
+    Account equity line, LTTB-decimated to max_points and drawn with WebGL
+    """
+    x, y = decimate_series(index, equity, max_points)
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=x,
+        y=y,
+        mode='lines',
+        name='Account Equity'
+    ))
+    
+    fig.update_layout(
+        title="Account Equity Over Time",
+        xaxis_title="Date",
+        yaxis_title="Equity ($)",
+        height=400
+    )
+    
+    return fig
+
+# Function to create a histogram of simulated outcomes
+def create_distribution_chart(values, title, x_title, bins=60):
+    """
+    Bins are counted with NumPy so only the bar heights reach the browser,
+    however many paths were simulated
+    """
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts / max(counts.sum(), 1) * 100,
+        width=np.diff(edges),
+        name=title
+    ))
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title="Share of Paths (%)",
+        bargap=0,
+        height=350
+    )
+    
     return fig
\ No newline at end of file
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from indicators import pivot_radii, pivots_from_radii, detect_patterns, combine_signals
+from backtester import simulate_trades, trades_to_frame
+from optimizer import (
+    SIGNAL_PARAMETERS, BACKTEST_PARAMETERS, LOWER_IS_BETTER, expand_grid, map_shared, shared_array, summarize_trades
+)
+
+# Function to lay out rolling train/test folds over n bars
+def make_folds(n, train_bars, test_bars, step=None):
+    """
+    step: bars between fold starts; only test_bars is accepted, since the
+    test slices are traded as one chained account and must neither overlap
+    (trades counted twice) nor leave gaps (bars never traded)
+    Returns: list of (train_start, train_end, test_start, test_end) bar
+    positions, ends exclusive; the last test slice may be shorter
+    """
+    step = step or test_bars
+    if step != test_bars:
+        raise ValueError(f"step must equal test_bars ({test_bars}) so test slices tile the history, got {step}")
+    folds = []
+    start = 0
+    while start + train_bars < n:
+        test_end = min(start + train_bars + test_bars, n)
+        folds.append((start, start + train_bars, start + train_bars, test_end))
+        start += step
+    return folds
+
+# Function to pick the best parameters on one fold's training slice
+def _optimize_fold(task):
+    (train_start, train_end), signal_grid, backtest_grid, initial_balance, metric, periods_per_year = task
+    close = shared_array('close')[train_start:train_end]
+    signals = shared_array('signals')
+    sign = -1 if metric in LOWER_IS_BETTER else 1
+
+    best = None
+    for k, signal_params in enumerate(signal_grid):
+        signal = signals[k, train_start:train_end]
+        for backtest_params in backtest_grid:
+            trades, final_balance = simulate_trades(close, signal, initial_balance, *backtest_params)
+            score = summarize_trades(close, trades, final_balance, initial_balance, periods_per_year)[metric]
+            if best is None or sign * score > sign * best[0]:
+                best = (score, k, backtest_params)
+    return best
+
+# Function to run a walk-forward optimization
+def run_walk_forward(df, param_grid, train_bars, test_bars, step=None, initial_balance=10000.0,
+                     metric='Return (%)', max_workers=None, periods_per_year=252):
+    """
+    Split the history into rolling train/test folds, choose the combination of
+    param_grid (as for optimizer.run_sweep) with the best `metric` on each
+    training slice, then trade it on the following test slice. metric is
+    any summarize_trades key; those in optimizer.LOWER_IS_BETTER are
+    minimized, the rest maximized.
+    Pivots, patterns and signals are computed once over the full series for
+    every signal configuration and sliced per fold; the training searches of
+    independent folds run in parallel. Test slices are traded in order, each
+    starting from the previous one's ending balance, and positions still open
+    at the end of a test slice are closed on its last bar. The full-series
+    pivots and patterns look ahead by their windows, exactly as in the
+    single backtest, so bars just before a fold boundary see the next fold.
+    Returns: (out-of-sample trades DataFrame, per-fold report DataFrame, final balance)
+    """
+    signal_grid, backtest_grid = expand_grid(param_grid)
+    close = np.asarray(df['Close'], dtype=float).reshape(-1)
+    high = np.asarray(df['High'], dtype=float).reshape(-1)
+    low = np.asarray(df['Low'], dtype=float).reshape(-1)
+
+    # Indicator arrays for the whole history, one signal row per configuration
+    high_radius, low_radius = pivot_radii(high, low, max(max(params[0] for params in signal_grid), 1))
+    signals = np.empty((len(signal_grid), len(close)), dtype=np.int8)
+    for k, (window, pattern_backcandles, pattern_window) in enumerate(signal_grid):
+        pivots = pivots_from_radii(high_radius, low_radius, window)
+        patterns = detect_patterns(close, high, low, pivots, pattern_backcandles, pattern_window)
+        signals[k] = combine_signals(pivots, patterns)
+
+    folds = make_folds(len(close), train_bars, test_bars, step)
+    tasks = [
+        ((train_start, train_end), signal_grid, backtest_grid, initial_balance, metric, periods_per_year)
+        for train_start, train_end, _, _ in folds
+    ]
+    choices = map_shared(_optimize_fold, tasks, {'close': close, 'signals': signals}, max_workers)
+
+    # Trade each fold's choice out of sample, chaining the balance
+    balance = initial_balance
+    logs = []
+    report = []
+    for fold, ((train_start, train_end, test_start, test_end), (score, k, backtest_params)) in enumerate(zip(folds, choices)):
+        start_balance = balance
+        trades, balance = simulate_trades(close[test_start:test_end], signals[k, test_start:test_end],
+                                          start_balance, *backtest_params)
+        trades['entry_bar'] = trades['entry_bar'] + test_start
+        trades['exit_bar'] = trades['exit_bar'] + test_start
+        logs.append(trades)
+
+        row = {
+            'Fold': fold,
+            'Train Start': df.index[train_start],
+            'Train End': df.index[train_end - 1],
+            'Test Start': df.index[test_start],
+            'Test End': df.index[test_end - 1],
+        }
+        row.update(zip(SIGNAL_PARAMETERS, signal_grid[k]))
+        row.update(zip(BACKTEST_PARAMETERS, backtest_params))
+        row.update({
+            f'Train {metric}': score,
+            'Test Trades': len(trades['balance']),
+            'Test Return (%)': (balance - start_balance) / start_balance * 100,
+            'Balance': balance,
+        })
+        report.append(row)
+
+    if logs:
+        combined = {column: np.concatenate([log[column] for log in logs]) for column in logs[0]}
+    else:
+        combined, _ = simulate_trades(close[:0], signals[0, :0], initial_balance, *backtest_grid[0])
+    return trades_to_frame(combined, df.index), pd.DataFrame(report), balance